@@ -0,0 +1,97 @@
+﻿"""Esquema inicial (users, pantry_items, recipes)
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-25 10:00:00
+
+Las bases de datos creadas antes de Alembic con Base.metadata.create_all ya
+tienen estas tablas; solo se crean las que falten.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("hashed_password", sa.String(length=255), nullable=False),
+            sa.Column("family_size", sa.Integer(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("is_superuser", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_login", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("idx_user_email", "users", ["email"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_id", "users", ["id"])
+
+    if "pantry_items" not in existing:
+        op.create_table(
+            "pantry_items",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("category", sa.String(length=50), nullable=False),
+            sa.Column("quantity", sa.Float(), nullable=False),
+            sa.Column("unit", sa.String(length=20), nullable=False),
+            sa.Column("expiration_date", sa.Date(), nullable=True),
+            sa.Column("barcode", sa.String(length=50), nullable=True),
+            sa.Column("location", sa.String(length=50), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_pantry_items_id", "pantry_items", ["id"])
+        op.create_index("ix_pantry_items_name", "pantry_items", ["name"])
+        op.create_index("ix_pantry_items_category", "pantry_items", ["category"])
+        op.create_index("ix_pantry_items_expiration_date", "pantry_items", ["expiration_date"])
+        op.create_index("idx_item_user", "pantry_items", ["user_id"])
+        op.create_index("idx_item_category", "pantry_items", ["category"])
+        op.create_index("idx_item_expiration", "pantry_items", ["expiration_date"])
+
+    if "recipes" not in existing:
+        op.create_table(
+            "recipes",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=200), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("ingredients", sa.Text(), nullable=False),
+            sa.Column("instructions", sa.Text(), nullable=False),
+            sa.Column("prep_time", sa.Integer(), nullable=False),
+            sa.Column("cook_time", sa.Integer(), nullable=True),
+            sa.Column("servings", sa.Integer(), nullable=True),
+            sa.Column("difficulty", sa.String(length=20), nullable=False),
+            sa.Column("cuisine", sa.String(length=50), nullable=True),
+            sa.Column("tags", sa.Text(), nullable=True),
+            sa.Column("image_url", sa.String(length=500), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_recipes_id", "recipes", ["id"])
+        op.create_index("ix_recipes_name", "recipes", ["name"])
+        op.create_index("idx_recipe_difficulty", "recipes", ["difficulty"])
+        op.create_index("idx_recipe_cuisine", "recipes", ["cuisine"])
+
+
+def downgrade() -> None:
+    op.drop_table("recipes")
+    op.drop_table("pantry_items")
+    op.drop_table("users")
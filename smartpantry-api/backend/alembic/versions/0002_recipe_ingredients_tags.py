@@ -0,0 +1,121 @@
+﻿"""Tablas recipe_ingredients y recipe_tags en lugar de columnas JSON
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-26 09:30:00
+
+"""
+import json
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _fold(value: str) -> str:
+    # Copia congelada de services.normalization.fold_text
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped.lower()).strip()
+
+
+def _load_list(raw):
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return []
+    return [str(v).strip() for v in value if str(v).strip()] if isinstance(value, list) else []
+
+
+def upgrade() -> None:
+    ingredients_table = op.create_table(
+        "recipe_ingredients",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("normalized_name", sa.String(length=200), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_recipe_ingredient_name", "recipe_ingredients", ["normalized_name", "recipe_id"])
+    op.create_index("idx_recipe_ingredient_recipe", "recipe_ingredients", ["recipe_id", "position"])
+
+    tags_table = op.create_table(
+        "recipe_tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("normalized_name", sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_recipe_tag_name", "recipe_tags", ["normalized_name", "recipe_id"])
+    op.create_index("idx_recipe_tag_recipe", "recipe_tags", ["recipe_id"])
+
+    bind = op.get_bind()
+    ingredient_rows, tag_rows = [], []
+    for recipe_id, raw_ingredients, raw_tags in bind.execute(
+        sa.text("SELECT id, ingredients, tags FROM recipes")
+    ):
+        seen = set()
+        for position, name in enumerate(_load_list(raw_ingredients)):
+            ingredient_rows.append({
+                "recipe_id": recipe_id,
+                "position": position,
+                "name": name[:200],
+                "normalized_name": _fold(name)[:200],
+            })
+        for name in _load_list(raw_tags):
+            key = _fold(name)[:50]
+            if key not in seen:
+                seen.add(key)
+                tag_rows.append({"recipe_id": recipe_id, "name": name[:50], "normalized_name": key})
+    if ingredient_rows:
+        op.bulk_insert(ingredients_table, ingredient_rows)
+    if tag_rows:
+        op.bulk_insert(tags_table, tag_rows)
+
+    with op.batch_alter_table("recipes") as batch_op:
+        batch_op.drop_column("ingredients")
+        batch_op.drop_column("tags")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("recipes") as batch_op:
+        batch_op.add_column(sa.Column("ingredients", sa.Text(), nullable=False, server_default="[]"))
+        batch_op.add_column(sa.Column("tags", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    ingredients, tags = {}, {}
+    for recipe_id, name in bind.execute(
+        sa.text("SELECT recipe_id, name FROM recipe_ingredients ORDER BY recipe_id, position")
+    ):
+        ingredients.setdefault(recipe_id, []).append(name)
+    for recipe_id, name in bind.execute(
+        sa.text("SELECT recipe_id, name FROM recipe_tags ORDER BY recipe_id, id")
+    ):
+        tags.setdefault(recipe_id, []).append(name)
+    for recipe_id in set(ingredients) | set(tags):
+        bind.execute(
+            sa.text("UPDATE recipes SET ingredients = :ingredients, tags = :tags WHERE id = :id"),
+            {
+                "id": recipe_id,
+                "ingredients": json.dumps(ingredients.get(recipe_id, []), ensure_ascii=False),
+                "tags": json.dumps(tags.get(recipe_id, []), ensure_ascii=False),
+            },
+        )
+
+    op.drop_table("recipe_tags")
+    op.drop_table("recipe_ingredients")
@@ -0,0 +1,29 @@
+﻿"""Índice compuesto para la paginación por cursor de pantry_items
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-27 11:15:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_item_user_expiration",
+        "pantry_items",
+        ["user_id", "expiration_date", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_item_user_expiration", table_name="pantry_items")
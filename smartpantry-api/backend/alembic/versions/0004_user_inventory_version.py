@@ -0,0 +1,45 @@
+﻿"""Versión del inventario por usuario para peticiones condicionales (ETag/Last-Modified)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-28 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("inventory_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "users",
+        sa.Column("inventory_updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Punto de partida: el último cambio conocido de sus items
+    op.execute(
+        """
+        UPDATE users SET inventory_updated_at = (
+            SELECT max(coalesce(pantry_items.updated_at, pantry_items.created_at))
+            FROM pantry_items
+            WHERE pantry_items.user_id = users.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("inventory_updated_at")
+        batch_op.drop_column("inventory_version")
@@ -0,0 +1,54 @@
+﻿"""Sincronización incremental: versión por item y tabla de bajas (tombstones)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-11-28 16:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Los items existentes quedan en la versión 0: entran en la primera sincronización completa
+    op.add_column(
+        "pantry_items",
+        sa.Column("sync_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "idx_item_user_sync",
+        "pantry_items",
+        ["user_id", "sync_version", "id"],
+    )
+    op.create_table(
+        "item_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("sync_version", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_tombstone_user_sync",
+        "item_tombstones",
+        ["user_id", "sync_version", "item_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_tombstone_user_sync", table_name="item_tombstones")
+    op.drop_table("item_tombstones")
+    op.drop_index("idx_item_user_sync", table_name="pantry_items")
+    with op.batch_alter_table("pantry_items") as batch_op:
+        batch_op.drop_column("sync_version")
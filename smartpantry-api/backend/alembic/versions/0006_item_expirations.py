@@ -0,0 +1,54 @@
+﻿"""Tabla precalculada de caducidades (ventana de 7 días) e índice (user_id, category)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-11-29 09:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "item_expirations",
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("expiration_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("item_id"),
+    )
+    op.create_index(
+        "idx_expiration_user_date",
+        "item_expirations",
+        ["user_id", "expiration_date", "item_id"],
+    )
+    # Una sola fila: día para el que se calculó la tabla (NULL = pendiente de calcular)
+    scans = op.create_table(
+        "expiration_scans",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("as_of", sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.bulk_insert(scans, [{"id": 1, "as_of": None}])
+    # Cubre el GROUP BY category de las estadísticas sin leer la tabla
+    op.create_index(
+        "idx_item_user_category",
+        "pantry_items",
+        ["user_id", "category"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_item_user_category", table_name="pantry_items")
+    op.drop_table("expiration_scans")
+    op.drop_index("idx_expiration_user_date", table_name="item_expirations")
+    op.drop_table("item_expirations")
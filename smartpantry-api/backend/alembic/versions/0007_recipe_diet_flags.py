@@ -0,0 +1,33 @@
+﻿"""Columna recipes.diet_flags (bits de dietas incompatibles) e índice
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-11-30 10:15:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Se rellena al arrancar con services.diet.sync_diet_flags (las reglas viven en el código)
+    op.add_column(
+        "recipes",
+        sa.Column("diet_flags", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("idx_recipe_diet", "recipes", ["diet_flags", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_recipe_diet", table_name="recipes")
+    with op.batch_alter_table("recipes") as batch_op:
+        batch_op.drop_column("diet_flags")
@@ -0,0 +1,95 @@
+﻿"""Búsqueda de items: columna search_name, tabla FTS5 trigram y triggers
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-12-01 09:00:00
+
+"""
+import logging
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+TRIGGERS = (
+    """
+    CREATE TRIGGER pantry_items_fts_ai AFTER INSERT ON pantry_items BEGIN
+        INSERT INTO pantry_items_fts (rowid, search_name) VALUES (new.id, new.search_name);
+    END
+    """,
+    """
+    CREATE TRIGGER pantry_items_fts_ad AFTER DELETE ON pantry_items BEGIN
+        INSERT INTO pantry_items_fts (pantry_items_fts, rowid, search_name)
+        VALUES ('delete', old.id, old.search_name);
+    END
+    """,
+    """
+    CREATE TRIGGER pantry_items_fts_au AFTER UPDATE OF search_name ON pantry_items BEGIN
+        INSERT INTO pantry_items_fts (pantry_items_fts, rowid, search_name)
+        VALUES ('delete', old.id, old.search_name);
+        INSERT INTO pantry_items_fts (rowid, search_name) VALUES (new.id, new.search_name);
+    END
+    """,
+)
+
+
+def _fold(value: str) -> str:
+    # Copia congelada de services.normalization.fold_text
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped.lower()).strip()
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pantry_items",
+        sa.Column("search_name", sa.String(length=100), nullable=False, server_default=""),
+    )
+    bind = op.get_bind()
+    rows = [
+        {"item_id": item_id, "search_name": _fold(name)}
+        for item_id, name in bind.execute(sa.text("SELECT id, name FROM pantry_items"))
+    ]
+    if rows:
+        bind.execute(
+            sa.text("UPDATE pantry_items SET search_name = :search_name WHERE id = :item_id"),
+            rows,
+        )
+    op.create_index("idx_item_user_search", "pantry_items", ["user_id", "search_name"])
+
+    if bind.dialect.name != "sqlite":
+        return
+    try:
+        # Tabla de contenido externo: solo guarda el índice; el texto sigue en pantry_items
+        op.execute(
+            "CREATE VIRTUAL TABLE pantry_items_fts USING fts5("
+            "search_name, content='pantry_items', content_rowid='id', tokenize='trigram')"
+        )
+    except sa.exc.OperationalError as exc:
+        # SQLite sin FTS5 o anterior a 3.34 (sin trigram): la app usa el índice en memoria
+        logger.warning("Sin FTS5 trigram, se omite pantry_items_fts: %s", exc)
+        return
+    for trigger in TRIGGERS:
+        op.execute(trigger)
+    op.execute("INSERT INTO pantry_items_fts (pantry_items_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for name in ("pantry_items_fts_au", "pantry_items_fts_ad", "pantry_items_fts_ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS pantry_items_fts")
+    op.drop_index("idx_item_user_search", table_name="pantry_items")
+    with op.batch_alter_table("pantry_items") as batch_op:
+        batch_op.drop_column("search_name")
@@ -0,0 +1,34 @@
+﻿"""Columna pantry_items.canonical_name (clave canónica del ingrediente) e índice
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-12-03 11:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Se rellena al arrancar con services.item_fields.sync_derived_fields, igual que
+    # recipe_ingredients.normalized_name (las reglas de canonicalización viven en el código)
+    op.add_column(
+        "pantry_items",
+        sa.Column("canonical_name", sa.String(length=100), nullable=False, server_default=""),
+    )
+    op.create_index("idx_item_user_canonical", "pantry_items", ["user_id", "canonical_name"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_item_user_canonical", table_name="pantry_items")
+    with op.batch_alter_table("pantry_items") as batch_op:
+        batch_op.drop_column("canonical_name")
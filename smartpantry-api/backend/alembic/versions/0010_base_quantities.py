@@ -0,0 +1,51 @@
+﻿"""Cantidades en unidad base en pantry_items y recipe_ingredients
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-12-05 16:45:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Se rellenan al arrancar con services.item_fields.sync_derived_fields (el registro
+    # de unidades vive en el código)
+    op.add_column(
+        "pantry_items",
+        sa.Column("base_quantity", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "pantry_items",
+        sa.Column("base_unit", sa.String(length=20), nullable=False, server_default=""),
+    )
+    op.add_column("recipe_ingredients", sa.Column("base_quantity", sa.Float(), nullable=True))
+    op.add_column("recipe_ingredients", sa.Column("base_unit", sa.String(length=20), nullable=True))
+    # Cubre las sumas por ingrediente y unidad sin leer la tabla
+    op.drop_index("idx_item_user_canonical", table_name="pantry_items")
+    op.create_index(
+        "idx_item_user_canonical",
+        "pantry_items",
+        ["user_id", "canonical_name", "base_unit", "base_quantity"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_item_user_canonical", table_name="pantry_items")
+    op.create_index("idx_item_user_canonical", "pantry_items", ["user_id", "canonical_name"])
+    with op.batch_alter_table("recipe_ingredients") as batch_op:
+        batch_op.drop_column("base_unit")
+        batch_op.drop_column("base_quantity")
+    with op.batch_alter_table("pantry_items") as batch_op:
+        batch_op.drop_column("base_unit")
+        batch_op.drop_column("base_quantity")
@@ -0,0 +1,60 @@
+﻿"""Eventos de consumo, agregados diarios por categoría y marca de agregación
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-12-08 12:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "consumption_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=10), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("canonical_name", sa.String(length=100), nullable=False),
+        sa.Column("base_quantity", sa.Float(), nullable=False),
+        sa.Column("base_unit", sa.String(length=20), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_consumption_user_event", "consumption_events", ["user_id", "id"])
+    op.create_table(
+        "consumption_daily",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("items_consumed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day", "category"),
+    )
+    # Una sola fila: hasta qué evento están sumados los agregados
+    state = op.create_table(
+        "consumption_rollup_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("last_event_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.bulk_insert(state, [{"id": 1, "last_event_id": 0}])
+
+
+def downgrade() -> None:
+    op.drop_table("consumption_rollup_state")
+    op.drop_table("consumption_daily")
+    op.drop_index("idx_consumption_user_event", table_name="consumption_events")
+    op.drop_table("consumption_events")
@@ -0,0 +1,200 @@
+﻿"""Sugerencias con LLM contra un servidor LLM falso en local.
+
+El servidor imita /api/generate de Ollama con una latencia artificial y cuenta
+las llamadas. Varios hogares piden sugerencias a la vez; muchos tienen la misma
+despensa escrita de otra forma (orden, mayúsculas, tildes, duplicados).
+
+1. naive: una llamada al LLM por petición (como llmClient.ts::generateSuggest).
+2. cold: SuggestionService con la caché vacía; huellas iguales comparten llamada.
+3. warm: las mismas peticiones con la caché ya llena.
+
+Al final compara, para una petición, esperar la respuesta completa con el
+modo stream (tiempo hasta el primer fragmento y hasta la primera receta).
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_ai_suggestions --requests 200 --pantries 20 --latency-ms 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services.ai_suggestions import SYSTEM_STYLE, SuggestionService, build_prompt, build_request
+from src.services.llm import LLMClient
+
+RECIPE = {
+    "name": "Tortilla de patatas",
+    "description": "Clásica y jugosa",
+    "ingredients": ["huevos", "patata", "aceite", "sal"],
+    "instructions": ["Freír la patata", "Batir los huevos", "Cuajar la tortilla"],
+    "prep_time": 15,
+    "cook_time": 20,
+    "servings": 2,
+    "difficulty": "easy",
+    "cuisine": "española",
+    "tags": ["vegetariana"],
+}
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with FakeLLMHandler.lock:
+            FakeLLMHandler.calls += 1
+        text = json.dumps({"recipes": [RECIPE] * 3}, ensure_ascii=False)
+        openai = self.path.endswith("/chat/completions")
+        if request.get("stream"):
+            self._stream(text, openai)
+            return
+
+        time.sleep(self.latency)
+        if openai:
+            body = {"choices": [{"message": {"role": "assistant", "content": text}}]}
+        else:
+            body = {"response": text, "done": True}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, text: str, openai: bool) -> None:
+        # La misma latencia total, repartida entre fragmentos de unos 16 caracteres
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if openai else "application/x-ndjson")
+        self.end_headers()
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            if openai:
+                line = "data: " + json.dumps({"choices": [{"delta": {"content": chunk}}]}) + "\n\n"
+            else:
+                line = json.dumps({"response": chunk, "done": False}) + "\n"
+            self.wfile.write(line.encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n" if openai else b'{"response": "", "done": true}\n')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_llm(latency: float) -> ThreadingHTTPServer:
+    FakeLLMHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+INGREDIENTS = [
+    "Huevos", "Patata", "Aceite", "Cebolla", "Tomate", "Arroz", "Pollo", "Ajo", "Limón",
+    "Queso", "Pimiento", "Calabacín", "Garbanzos", "Atún", "Espinacas", "Champiñón",
+]
+
+
+def base_pantries(count: int) -> list:
+    rng = random.Random(0)
+    return [rng.sample(INGREDIENTS, 6) for _ in range(count)]
+
+
+def household_pantry(rng: random.Random, bases: list) -> list:
+    """Una de las despensas base, escrita como la teclearía cada hogar"""
+    variants = [
+        name.upper() if rng.random() < 0.3 else name.replace("ó", "o") if rng.random() < 0.3 else name
+        for name in rng.choice(bases)
+    ]
+    if rng.random() < 0.3:
+        variants.append(variants[0])
+    rng.shuffle(variants)
+    return variants
+
+
+async def naive(client: LLMClient, requests: list) -> None:
+    await asyncio.gather(*(client.complete(SYSTEM_STYLE, build_prompt(request)) for request in requests))
+
+
+async def first_recipe(service: SuggestionService, request) -> tuple:
+    """(ms hasta el primer fragmento, hasta la primera receta, hasta el final) en modo stream"""
+    start = time.perf_counter()
+    first_token = first = None
+    async for message in service.stream(request):
+        elapsed = (time.perf_counter() - start) * 1000
+        if message["type"] == "token" and first_token is None:
+            first_token = elapsed
+        if message["type"] == "recipe" and first is None:
+            first = elapsed
+    return first_token, first, (time.perf_counter() - start) * 1000
+
+
+def run(label: str, coro_factory) -> None:
+    FakeLLMHandler.calls = 0
+    start = time.perf_counter()
+    asyncio.run(coro_factory())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<6} {elapsed * 1000:8.1f} ms   llamadas al LLM={FakeLLMHandler.calls}")
+
+
+def main(args) -> None:
+    from src.core.config import get_settings
+
+    server = start_fake_llm(args.latency_ms / 1000)
+    get_settings().OLLAMA_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    rng = random.Random(1)
+    bases = base_pantries(args.pantries)
+    requests = [
+        build_request(household_pantry(rng, bases), [], 2)
+        for _ in range(args.requests)
+    ]
+    distinct = len({request.fingerprint for request in requests})
+    print(f"{args.requests} peticiones, {distinct} despensas distintas, latencia LLM {args.latency_ms} ms\n")
+
+    service = SuggestionService(LLMClient("ollama", "fake"), max_entries=1000, ttl=3600)
+
+    async def naive_run():
+        client = LLMClient("ollama", "fake")
+        try:
+            await naive(client, requests)
+        finally:
+            await client.close()
+
+    async def service_run():
+        try:
+            await asyncio.gather(*(service.suggest(request) for request in requests))
+        finally:
+            await service.client.close()
+
+    run("naive", naive_run)
+    run("cold", service_run)
+    run("warm", service_run)
+
+    async def streaming():
+        fresh = SuggestionService(LLMClient("ollama", "fake"), max_entries=1000, ttl=3600)
+        request = build_request(["pan", "aceite", "ajo"], [], 4)
+        try:
+            start = time.perf_counter()
+            await fresh.client.complete(SYSTEM_STYLE, build_prompt(request))
+            blocking = (time.perf_counter() - start) * 1000
+            first_token, first, total = await first_recipe(fresh, request)
+        finally:
+            await fresh.client.close()
+        print(f"\nsin stream: respuesta completa en {blocking:.0f} ms")
+        print(f"stream:     primer fragmento {first_token:.0f} ms, primera receta {first:.0f} ms, fin {total:.0f} ms")
+
+    asyncio.run(streaming())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pantries", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=500)
+    main(parser.parse_args())
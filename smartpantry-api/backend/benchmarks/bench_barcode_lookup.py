@@ -0,0 +1,133 @@
+﻿"""Consultas de códigos de barras contra un Open Food Facts simulado en local.
+
+Un servidor HTTP de stub responde /api/v2/product/<code>.json con una latencia
+artificial y cuenta las peticiones que recibe. Se comparan:
+
+1. naive: una petición sin caché ni pool por escaneo (como offClient.ts::fetchOFF).
+2. cold: BarcodeService con la caché vacía; los escaneos concurrentes del mismo
+   código se agrupan en una sola petición.
+3. warm: los mismos escaneos con la caché SQLite ya llena (no sale nada de la máquina).
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_barcode_lookup --scans 500 --codes 50 --latency-ms 80 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from src.services.barcode import BarcodeService, ProductCache
+
+
+class StubOFFHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubOFFHandler.lock:
+            StubOFFHandler.hits += 1
+        time.sleep(self.latency)
+        code = self.path.split("/")[-1].split(".")[0]
+        if code.endswith("0"):
+            status, body = 404, {"status": 0, "code": code}
+        else:
+            status, body = 200, {"status": 1, "code": code, "product": {
+                "code": code,
+                "product_name": f"Producto {code}",
+                "brands": "Marca",
+                "nutriments": {"energy-kcal_100g": 250, "sugars_100g": 12.5, "salt_100g": 0.8},
+                "nutriscore_grade": "c",
+                "nova_group": 3,
+            }}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency: float) -> ThreadingHTTPServer:
+    StubOFFHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOFFHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def naive(base_url: str, scans: list, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def fetch(code: str) -> None:
+        async with slots:
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                await client.get(f"/api/v2/product/{code}.json")
+
+    await asyncio.gather(*(fetch(code) for code in scans))
+
+
+async def with_service(service: BarcodeService, scans: list, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def lookup(code: str) -> None:
+        async with slots:
+            await service.lookup(code)
+
+    await asyncio.gather(*(lookup(code) for code in scans))
+
+
+def run(label: str, coro_factory) -> None:
+    StubOFFHandler.hits = 0
+    start = time.perf_counter()
+    asyncio.run(coro_factory())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<6} {elapsed * 1000:8.1f} ms   peticiones a OFF={StubOFFHandler.hits}")
+
+
+def main(args) -> None:
+    server = start_stub(args.latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    random.seed(1)
+    codes = [f"{8410000000000 + i:013d}" for i in range(args.codes)]
+    # Distribución sesgada: unos pocos productos concentran la mayoría de escaneos
+    scans = random.choices(codes, weights=[1 / (rank + 1) for rank in range(len(codes))], k=args.scans)
+    print(
+        f"{args.scans} escaneos de {args.codes} códigos, {args.concurrency} clientes a la vez, "
+        f"latencia OFF {args.latency_ms} ms\n"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ProductCache(os.path.join(tmp, "products_cache.db"), max_entries=10000)
+
+        async def service_run():
+            service = BarcodeService(base_url, cache)
+            try:
+                await with_service(service, scans, args.concurrency)
+            finally:
+                await service.close()
+
+        run("naive", lambda: naive(base_url, scans, args.concurrency))
+        run("cold", service_run)
+        run("warm", service_run)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scans", type=int, default=500)
+    parser.add_argument("--codes", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=20)
+    main(parser.parse_args())
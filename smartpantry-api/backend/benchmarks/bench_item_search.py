@@ -0,0 +1,107 @@
+﻿"""Búsqueda de items por subcadena sobre 100k filas: LIKE '%q%' frente a FTS5 trigram.
+
+Se crea una base SQLite temporal con las migraciones (incluida pantry_items_fts
+y sus triggers) y se mide la latencia de búsqueda de un usuario en dos repartos:
+todos los items de un único usuario y los mismos items entre muchos usuarios.
+
+1. like:   WHERE user_id = ? AND search_name LIKE '%q%' (lo que haría el typeahead sin índice)
+2. fts:    ItemSearch con la tabla FTS5
+3. memory: ItemSearch con el índice trigram en memoria (motores sin FTS5), ya construido
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_item_search --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.database import _run_migrations
+from src.models.database_models import PantryItem, User
+from src.services.item_fields import with_derived_fields
+from src.services.search import ItemSearch
+
+WORDS = [
+    "jamón", "serrano", "tomate", "frito", "queso", "manchego", "leche", "entera", "atún",
+    "aceite", "oliva", "arroz", "bomba", "garbanzos", "lentejas", "pimiento", "rojo", "cebolla",
+    "patata", "huevos", "yogur", "natural", "pan", "integral", "chorizo", "ibérico", "salmón",
+]
+QUERIES = ["tom", "jamon", "JAMÓN ser", "iberi", "atun", "man", "oliva virgen", "xyz"]
+
+
+def item_rows(rows: int, users: int) -> list:
+    rng = random.Random(1)
+    return [
+        with_derived_fields({
+            "user_id": 1 + i % users,
+            "name": " ".join(rng.sample(WORDS, 2)) + f" {i % 97}",
+            "category": "other",
+            "quantity": 1.0,
+            "unit": "u",
+        })
+        for i in range(rows)
+    ]
+
+
+async def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            await fn(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+async def scenario(label: str, rows: int, users: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'search.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(_run_migrations)
+            await conn.execute(insert(User), [
+                {"id": user_id, "email": f"u{user_id}@bench", "hashed_password": "x"}
+                for user_id in range(1, users + 1)
+            ])
+            await conn.execute(insert(PantryItem), item_rows(rows, users))
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with session_factory() as db:
+            async def like(query: str):
+                filters = [PantryItem.search_name.contains(term) for term in query.lower().split()]
+                return (await db.scalars(
+                    select(PantryItem).where(PantryItem.user_id == 1, *filters).limit(20)
+                )).all()
+
+            fts, memory = ItemSearch(), ItemSearch()
+            memory._fts = False
+            await memory.search(db, 1, "calentar", 20)
+
+            print(f"\n{label}: {rows} items, {users} usuarios (ms por búsqueda, mediana / máx)")
+            for name, fn in (
+                ("like", like),
+                ("fts", lambda query: fts.search(db, 1, query, 20)),
+                ("memory", lambda query: memory.search(db, 1, query, 20)),
+            ):
+                median, worst = await measure(fn, repeat)
+                print(f"  {name:<7} {median:6.2f} / {worst:6.2f}")
+        await engine.dispose()
+
+
+def main(args) -> None:
+    asyncio.run(scenario("un usuario", args.rows, 1, args.repeat))
+    asyncio.run(scenario("repartido", args.rows, args.users, args.repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
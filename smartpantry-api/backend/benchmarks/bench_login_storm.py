@@ -0,0 +1,83 @@
+﻿"""Latencia de endpoints ajenos al login durante una avalancha de logins.
+
+Compara el hash ejecutado dentro del event loop (como hacía el SHA-256 en
+línea, pero con el coste de scrypt) con el pool de hilos de
+core/security/passwords.py. Mide p50/p99 de GET / mientras N clientes
+hacen login en bucle.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_login_storm --logins 16 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_tmp.name, 'storm.db')}"
+
+import httpx  # noqa: E402
+
+from src.api.main import app  # noqa: E402
+from src.core.database import init_db  # noqa: E402
+from src.core.security import passwords  # noqa: E402
+
+CREDENTIALS = {"email": "storm@smartpantry.com", "password": "Tormenta123"}
+
+
+async def _inline(func, *args):
+    return func(*args)
+
+
+async def login_loop(client, deadline: float, counter: list) -> None:
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/v1/auth/login", json=CREDENTIALS)
+        response.raise_for_status()
+        counter[0] += 1
+
+
+async def probe_loop(client, deadline: float, samples: list) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def run_mode(label: str, client, args) -> None:
+    samples, logins = [], [0]
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        probe_loop(client, deadline, samples),
+        *(login_loop(client, deadline, logins) for _ in range(args.logins)),
+    )
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<8} GET /: p50={statistics.median(samples):7.2f}ms p99={p99:7.2f}ms "
+        f"(n={len(samples)})  logins/s={logins[0] / args.seconds:.1f}"
+    )
+
+
+async def main(args) -> None:
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/v1/auth/register", json=CREDENTIALS)
+        response.raise_for_status()
+
+        print(f"{args.logins} clientes de login concurrentes, {args.seconds}s por modo")
+        pooled = passwords._run_in_pool
+        passwords._run_in_pool = _inline
+        await run_mode("inline", client, args)
+        passwords._run_in_pool = pooled
+        await run_mode("pool", client, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
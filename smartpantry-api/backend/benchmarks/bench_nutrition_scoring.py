@@ -0,0 +1,101 @@
+﻿"""Puntuación nutricional de una despensa completa: por producto frente a por lotes.
+
+1. loop: computeScore de score.ts traducido tal cual, un producto cada vez.
+2. build_batch: paso de los productos (dicts de OFF) a columnas NumPy.
+3. score+summary: score_batch y summarize sobre las columnas ya construidas.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_nutrition_scoring --items 500
+"""
+import argparse
+import random
+import time
+
+from src.ml.nutrition import build_batch, score_batch, summarize
+
+GRADE_POINTS = {"a": 90, "b": 75, "c": 60, "d": 40, "e": 20}
+
+
+def clamp(n, low, high):
+    return max(low, min(high, n))
+
+
+def compute_score(product: dict) -> tuple:
+    n = product.get("nutriments") or {}
+    energy, sugars, sat = n.get("energy-kcal_100g"), n.get("sugars_100g"), n.get("saturated-fat_100g")
+    salt, fiber, proteins = n.get("salt_100g"), n.get("fiber_100g"), n.get("proteins_100g")
+    base = GRADE_POINTS.get(product.get("nutriscore_grade"), 60)
+    if sugars is not None:
+        base -= clamp((sugars - 5) * 2, 0, 30)
+    if sat is not None:
+        base -= clamp((sat - 2) * 4, 0, 30)
+    if salt is not None:
+        base -= clamp((salt - 0.3) * 25, 0, 25)
+    if fiber is not None:
+        base += clamp((fiber - 3) * 4, -10, 20)
+    if proteins is not None:
+        base += clamp((proteins - 5) * 2, -10, 20)
+    warnings = []
+    if sugars is not None and sugars > 10:
+        warnings.append("Alto en azúcares (>10g/100g)")
+    if sat is not None and sat > 5:
+        warnings.append("Alto en grasas saturadas (>5g/100g)")
+    if salt is not None and salt > 1.2:
+        warnings.append("Alto en sal (>1.2g/100g)")
+    if energy is not None and energy > 400:
+        warnings.append("Muy calórico (>400kcal/100g)")
+    if (product.get("nova_group") or 0) >= 4:
+        warnings.append("Ultraprocesado (NOVA 4)")
+    return clamp(int(base + 0.5), 0, 100), warnings
+
+
+def random_product(rng: random.Random) -> dict:
+    nutriments = {
+        key: round(rng.uniform(0, high), 1)
+        for key, high in (
+            ("energy-kcal_100g", 600), ("sugars_100g", 40), ("saturated-fat_100g", 15),
+            ("salt_100g", 3), ("fiber_100g", 10), ("proteins_100g", 30),
+        )
+        if rng.random() > 0.1
+    }
+    return {
+        "nutriments": nutriments,
+        "nutriscore_grade": rng.choice("abcde") if rng.random() > 0.2 else "unknown",
+        "nova_group": rng.randint(1, 4),
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(args) -> None:
+    rng = random.Random(1)
+    products = [random_product(rng) for _ in range(args.items)]
+    batch = build_batch(products)
+
+    def loop():
+        results = [compute_score(product) for product in products]
+        return sum(score for score, _ in results) / len(results)
+
+    def vectorized():
+        scores, warnings = score_batch(batch)
+        return summarize(batch, scores, warnings)
+
+    # Las dos versiones deben dar la misma media
+    assert abs(loop() - vectorized()["average_score"]) < 0.05
+
+    print(f"{args.items} productos")
+    print(f"loop          {timed(loop, args.repeat):8.1f} us")
+    print(f"build_batch   {timed(lambda: build_batch(products), args.repeat):8.1f} us")
+    print(f"score+summary {timed(vectorized, args.repeat):8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+﻿"""Coste por comprobación y precisión entre procesos de los almacenes de rate limit.
+
+1. Microsegundos por hit() en MemoryTokenBucketStore y SQLiteTokenBucketStore.
+2. Varios procesos (como workers de uvicorn) consumen la misma clave durante
+   unos segundos. Con el almacén compartido, el total admitido debe ser
+   capacidad + tasa * segundos. Con un almacén en memoria por proceso se
+   multiplica por el número de procesos.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_rate_limit --workers 4 --seconds 3
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.core.rate_limit import MemoryTokenBucketStore, SQLiteTokenBucketStore
+
+PER_MINUTE = 600
+CAPACITY = 60
+
+
+def per_check_cost(store, checks: int) -> float:
+    rate = PER_MINUTE / 60
+    start = time.perf_counter()
+    for i in range(checks):
+        store.hit(f"user:{i % 1000}", rate, CAPACITY)
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def hammer(job: tuple) -> int:
+    kind, path, seconds = job
+    store = SQLiteTokenBucketStore(path) if kind == "sqlite" else MemoryTokenBucketStore()
+    rate = PER_MINUTE / 60
+    allowed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if store.hit("user:1", rate, CAPACITY)[0]:
+            allowed += 1
+        time.sleep(0.0005)
+    return allowed
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ratelimit.db")
+        print(f"memory: {per_check_cost(MemoryTokenBucketStore(), args.checks):6.1f} us/check")
+        print(f"sqlite: {per_check_cost(SQLiteTokenBucketStore(path), args.checks):6.1f} us/check")
+
+        expected = CAPACITY + PER_MINUTE / 60 * args.seconds
+        print(f"\n{args.workers} procesos, {args.seconds}s, límite esperado ~{expected:.0f} admitidas")
+        for kind in ("memory", "sqlite"):
+            shared = os.path.join(tmp, f"accuracy-{kind}.db")
+            jobs = [(kind, shared, args.seconds)] * args.workers
+            with multiprocessing.Pool(args.workers) as pool:
+                allowed = sum(pool.map(hammer, jobs))
+            print(f"{kind:<7} admitidas={allowed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--checks", type=int, default=50000)
+    main(parser.parse_args())
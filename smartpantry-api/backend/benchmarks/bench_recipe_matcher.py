@@ -0,0 +1,90 @@
+﻿"""Benchmark del índice de recetas.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_recipe_matcher --recipes 50000 --pantry 40
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from src.services.recipe_matcher import RecipeIndex
+
+BASE_INGREDIENTS = [
+    "sal", "aceite de oliva", "ajo", "cebolla", "tomate", "pimienta", "huevo",
+    "patata", "arroz", "pasta", "pollo", "leche", "harina", "queso", "pimiento",
+    "zanahoria", "limón", "perejil", "atún", "garbanzos", "lentejas", "jamón",
+]
+
+
+def build_vocabulary(size: int) -> list:
+    extra = [f"ingrediente {i}" for i in range(size - len(BASE_INGREDIENTS))]
+    return BASE_INGREDIENTS + extra
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipes", type=int, default=50_000)
+    parser.add_argument("--vocabulary", type=int, default=3_000)
+    parser.add_argument("--pantry", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="p99 máximo permitido")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = build_vocabulary(args.vocabulary)
+    # Distribución tipo Zipf: pocos ingredientes aparecen en muchas recetas
+    weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+
+    index = RecipeIndex()
+    start = time.perf_counter()
+    for recipe_id in range(1, args.recipes + 1):
+        size = rng.randint(5, 14)
+        index.upsert(recipe_id, rng.choices(vocabulary, cum_weights=weights, k=size))
+    build_s = time.perf_counter() - start
+
+    pantries = [
+        rng.choices(vocabulary, cum_weights=weights, k=args.pantry) for _ in range(args.queries)
+    ]
+    index.match(pantries[0], limit=args.limit)  # calentar cachés de postings
+
+    samples = []
+    for pantry in pantries:
+        start = time.perf_counter()
+        index.match(pantry, limit=args.limit)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    update_samples = []
+    for _ in range(1000):
+        recipe_id = rng.randint(1, args.recipes)
+        start = time.perf_counter()
+        index.upsert(recipe_id, rng.choices(vocabulary, cum_weights=weights, k=8))
+        update_samples.append((time.perf_counter() - start) * 1000)
+
+    p99 = percentile(samples, 99)
+    print(f"recetas={args.recipes} vocabulario={args.vocabulary} despensa={args.pantry}")
+    print(f"construcción índice: {build_s:.2f}s")
+    print(
+        f"match: p50={statistics.median(samples):.3f}ms "
+        f"p95={percentile(samples, 95):.3f}ms p99={p99:.3f}ms"
+    )
+    print(f"upsert: p50={statistics.median(update_samples):.3f}ms")
+
+    if p99 > args.budget_ms:
+        print(f"FALLO: p99 {p99:.3f}ms supera el presupuesto de {args.budget_ms}ms")
+        return 1
+    print(f"OK: p99 dentro del presupuesto de {args.budget_ms}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
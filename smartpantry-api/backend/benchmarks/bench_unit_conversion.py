@@ -0,0 +1,72 @@
+﻿"""Conversión de cantidades de la despensa a gramos: fila a fila frente a por columnas.
+
+Cada fila es un item (cantidad, unidad libre, ingrediente) como los guarda la API.
+
+1. loop:         to_base y densidad en Python, una fila cada vez (lo que había que hacer
+                 sin base_quantity: parsear la unidad de texto en cada consulta).
+2. to_base_many: paso de las unidades de texto a cantidad base con NumPy (POST/PATCH /items/bulk).
+3. convert_many: conversión a gramos sobre las columnas base_quantity/base_unit ya guardadas.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.bench_unit_conversion --rows 100000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.services.units import MASS, VOLUME, convert_many, density, to_base, to_base_many
+
+UNITS = ["g", "gr", "Gramos", "kg", "Kilos", "ml", "l", "Litros", "cucharadas", "taza", "uds", "latas"]
+NAMES = ["arroz", "harina", "azúcar", "leche", "aceite de oliva", "tomate", "sal", "atún"]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main(args) -> None:
+    rng = random.Random(1)
+    quantities = [round(rng.uniform(0.5, 500), 1) for _ in range(args.rows)]
+    units = [rng.choice(UNITS) for _ in range(args.rows)]
+    names = [rng.choice(NAMES) for _ in range(args.rows)]
+    # Lo que ya está en la tabla tras las escrituras
+    base_quantities, base_units = to_base_many(quantities, units)
+    densities = np.array([density(name) or np.nan for name in names])
+    targets = np.full(args.rows, MASS, dtype=object)
+
+    def loop():
+        total = 0.0
+        for quantity, unit, name in zip(quantities, units, names):
+            value, base_unit = to_base(quantity, unit)
+            if base_unit == VOLUME:
+                factor = density(name)
+                value = value * factor if factor else None
+            elif base_unit != MASS:
+                value = None
+            if value is not None:
+                total += value
+        return total
+
+    def vectorized():
+        grams = convert_many(base_quantities, base_units, targets, densities)
+        return np.nansum(grams)
+
+    # Las dos versiones deben dar el mismo total
+    assert abs(loop() - vectorized()) < 1e-6 * loop()
+
+    print(f"{args.rows} filas")
+    print(f"loop          {timed(loop, args.repeat):8.2f} ms")
+    print(f"to_base_many  {timed(lambda: to_base_many(quantities, units), args.repeat):8.2f} ms")
+    print(f"convert_many  {timed(vectorized, args.repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+﻿"""Prueba de carga de concurrencia lectura/escritura en SQLite.
+
+Compara el modo por defecto (journal DELETE) con el perfil de Settings
+(WAL, synchronous=NORMAL, busy_timeout, cache_size, mmap_size) lanzando
+escritores y lectores en procesos separados, como varios workers de
+uvicorn, contra un fichero temporal.
+
+Uso (desde smartpantry-api/backend):
+    python -m benchmarks.load_sqlite_concurrency --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.core.database import Base, build_engine
+from src.models.database_models import PantryItem, User
+
+
+async def writer(session_factory, deadline: float, stats: dict, worker: int) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        try:
+            async with session_factory() as db:
+                async with db.begin():
+                    await db.execute(insert(PantryItem).values(
+                        user_id=1,
+                        name=f"w{worker}-{i}",
+                        category="grains",
+                        quantity=1.0,
+                        unit="kg",
+                        expiration_date=date(2030, 1, 1 + i % 28),
+                    ))
+            stats["writes"] += 1
+        except OperationalError:
+            stats["locked"] += 1
+        i += 1
+
+
+async def reader(session_factory, deadline: float, stats: dict) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            async with session_factory() as db:
+                await db.execute(
+                    select(PantryItem.category, func.count(PantryItem.id))
+                    .where(PantryItem.user_id == 1)
+                    .group_by(PantryItem.category)
+                )
+            stats["reads"] += 1
+        except OperationalError:
+            stats["locked"] += 1
+
+
+async def run_worker(url: str, tuned: bool, role: str, worker: int, seconds: float) -> dict:
+    engine = build_engine(url, sqlite_tuning=tuned)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    stats = {"writes": 0, "reads": 0, "locked": 0}
+    deadline = time.perf_counter() + seconds
+    if role == "writer":
+        await writer(session_factory, deadline, stats, worker)
+    else:
+        await reader(session_factory, deadline, stats)
+    await engine.dispose()
+    return stats
+
+
+def worker_process(job: tuple) -> dict:
+    return asyncio.run(run_worker(*job))
+
+
+async def prepare(url: str, tuned: bool) -> None:
+    engine = build_engine(url, sqlite_tuning=tuned)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        db.add(User(id=1, email="load@smartpantry.com", hashed_password="x"))
+        await db.commit()
+    await engine.dispose()
+
+
+def run_profile(label: str, tuned: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'load.db')}"
+        asyncio.run(prepare(url, tuned))
+        jobs = [(url, tuned, "writer", n, args.seconds) for n in range(args.writers)]
+        jobs += [(url, tuned, "reader", n, args.seconds) for n in range(args.readers)]
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.map(worker_process, jobs)
+
+    stats = {key: sum(result[key] for result in results) for key in ("writes", "reads", "locked")}
+    print(
+        f"{label:<10} escrituras/s={stats['writes'] / args.seconds:>8.0f}  "
+        f"lecturas/s={stats['reads'] / args.seconds:>8.0f}  "
+        f"'database is locked'={stats['locked']}"
+    )
+    return stats
+
+
+def main(args) -> None:
+    print(f"{args.writers} procesos escritores, {args.readers} lectores, {args.seconds}s por perfil")
+    before = run_profile("default", False, args)
+    after = run_profile("tuned", True, args)
+    for key in ("writes", "reads"):
+        if before[key]:
+            print(f"{key}: x{after[key] / before[key]:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    main(parser.parse_args())
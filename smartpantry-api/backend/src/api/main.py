@@ -1,18 +1,27 @@
-﻿from fastapi import FastAPI, Request, status
+﻿from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import asyncio
 import logging
 import time
 
+from src.core.compression import StreamingAwareGZipMiddleware
 from src.core.config import get_settings
-from src.core.database import init_db
-from src.api.routes import items, recipes, users, auth
+from src.core.database import init_db, AsyncSessionLocal
+from src.core.rate_limit import limit_per_ip
+from src.core.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, registry
+from src.api.routes import items, recipes, users, auth, events, products, shopping, analytics
+from src.core.scheduler import run_daily, run_every
+from src.services.barcode import barcode_service
+from src.services.consumption import rollup_consumption
+from src.services.diet import sync_diet_flags
+from src.services.expiration_index import refresh_expiration_index
+from src.services.expiry_alerts import send_expiry_alerts
+from src.services.item_fields import sync_derived_fields
+from src.services.llm import llm_client
+from src.services.recipe_matcher import load_recipe_index
 
 settings = get_settings()
 
@@ -23,18 +32,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Iniciando SmartPantry AI Backend...")
     await init_db()
     logger.info("Base de datos inicializada")
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            # Primero las claves canónicas: las reglas de dieta se evalúan sobre ellas
+            await sync_derived_fields(session)
+            await sync_diet_flags(session)
+        indexed = await load_recipe_index(session)
+    logger.info(f"Índice de recetas cargado: {indexed} recetas")
+    await refresh_expiration_index()
+    # Tareas de fondo: recalcular caducidades al cambiar de día, avisar de lo que caduca mañana
+    # y sumar los eventos de consumo a los agregados diarios
+    background_tasks = [
+        asyncio.create_task(run_daily(0, refresh_expiration_index, "tabla de caducidades")),
+        asyncio.create_task(run_daily(settings.EXPIRY_ALERT_HOUR, send_expiry_alerts, "avisos de caducidad")),
+        asyncio.create_task(run_every(
+            settings.CONSUMPTION_ROLLUP_INTERVAL_SECONDS, rollup_consumption, "agregados de consumo"
+        )),
+    ]
     yield
     # Shutdown
     logger.info("Cerrando SmartPantry AI Backend...")
+    for task in background_tasks:
+        task.cancel()
+    await barcode_service.close()
+    await llm_client.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -45,23 +72,6 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Middleware de logging de requests
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} "
-        f"- Status: {response.status_code} "
-        f"- Time: {process_time:.2f}s"
-    )
-    
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -69,14 +79,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Gzip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Gzip compression (excepto streams SSE)
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1000)
 
-# Rate limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Métricas de peticiones (el más externo: mide también CORS y gzip)
+if settings.METRICS_ENABLED:
+    app.add_middleware(
+        MetricsMiddleware,
+        sample_rate=settings.METRICS_LOG_SAMPLE_RATE,
+        slow_request_ms=settings.METRICS_SLOW_REQUEST_MS,
+    )
 
 # Exception handlers
 @app.exception_handler(RequestValidationError)
@@ -103,6 +118,10 @@ app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["aut
 app.include_router(items.router, prefix=f"{settings.API_V1_STR}/items", tags=["items"])
 app.include_router(recipes.router, prefix=f"{settings.API_V1_STR}/recipes", tags=["recipes"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
+app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"])
+app.include_router(products.router, prefix=f"{settings.API_V1_STR}/products", tags=["products"])
+app.include_router(shopping.router, prefix=f"{settings.API_V1_STR}/shopping", tags=["shopping"])
+app.include_router(analytics.router, prefix=f"{settings.API_V1_STR}/analytics", tags=["analytics"])
 
 @app.get("/")
 async def root():
@@ -113,9 +132,13 @@ async def root():
         "docs": "/docs"
     }
 
-@app.get("/health")
-@limiter.limit("10/minute")
-async def health(request: Request):
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/health", dependencies=[Depends(limit_per_ip("health", 10))])
+async def health():
     return {
         "status": "healthy",
         "timestamp": time.time()
@@ -0,0 +1,21 @@
+﻿from fastapi import APIRouter, Depends, Query
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import get_settings
+from src.core.database import get_db
+from src.core.rate_limit import limit_per_user
+from src.core.security.auth import get_current_user
+from src.models.schemas import ConsumptionTrend
+from src.services.consumption import consumption_trends
+
+settings = get_settings()
+router = APIRouter(dependencies=[Depends(limit_per_user("analytics", settings.RATE_LIMIT_PER_MINUTE))])
+
+@router.get("/consumption", response_model=List[ConsumptionTrend])
+async def get_consumption_trends(
+    days: int = Query(28, ge=2, le=365, description="Días del periodo analizado"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Consumo por categoría y tendencia (segunda mitad del periodo frente a la primera)"""
+    return await consumption_trends(db, current_user["id"], days)
@@ -3,12 +3,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import timedelta
 from src.core.database import get_db
-from src.core.security.auth import (
-    verify_password, 
-    get_password_hash, 
-    create_access_token,
-    get_current_user
-)
+from src.core.rate_limit import limit_per_ip, limit_per_user
+from src.core.security.auth import create_access_token, get_current_user
+from src.core.security.passwords import DUMMY_HASH, hash_password, verify_password
 from src.models.schemas import UserCreate, UserLogin, Token, UserResponse
 from src.models.database_models import User
 from src.core.config import get_settings
@@ -16,7 +13,16 @@ from src.core.config import get_settings
 settings = get_settings()
 router = APIRouter()
 
-@router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+# Login y registro se limitan por IP (aún no hay usuario); el resto, por usuario
+login_rate_limit = limit_per_ip("login", settings.RATE_LIMIT_AUTH_PER_MINUTE)
+user_rate_limit = limit_per_user("auth", settings.RATE_LIMIT_PER_MINUTE)
+
+@router.post(
+    "/register",
+    response_model=Token,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(login_rate_limit)]
+)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -33,7 +39,7 @@ async def register(
         )
     
     # Crear usuario
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -60,7 +66,7 @@ async def register(
         )
     )
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login(
     credentials: UserLogin,
     db: AsyncSession = Depends(get_db)
@@ -69,7 +75,12 @@ async def login(
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    # Sin usuario se verifica contra un hash de relleno: mismo coste, sin enumerar emails
+    valid, new_hash = await verify_password(
+        credentials.password,
+        user.hashed_password if user else DUMMY_HASH
+    )
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -82,6 +93,10 @@ async def login(
             detail="Usuario inactivo"
         )
     
+    # Migración transparente de hashes SHA-256 heredados o con coste antiguo
+    if new_hash:
+        user.hashed_password = new_hash
+    
     # Crear token
     access_token = create_access_token(
         data={"sub": user.id, "email": user.email}
@@ -98,21 +113,12 @@ async def login(
         )
     )
 
-@router.get("/me", response_model=UserResponse)
-async def get_me(
-    current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Obtener información del usuario actual"""
-    result = await db.execute(select(User).where(User.id == current_user["id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    
-    return user
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(user_rate_limit)])
+async def get_me(current_user: dict = Depends(get_current_user)):
+    """Obtener información del usuario actual (desde el principal cacheado)"""
+    return UserResponse(**current_user)
 
-@router.post("/logout")
+@router.post("/logout", dependencies=[Depends(user_rate_limit)])
 async def logout(current_user: dict = Depends(get_current_user)):
     """Logout (el cliente debe eliminar el token)"""
     return {"message": "Sesión cerrada exitosamente"}
@@ -0,0 +1,65 @@
+﻿from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+import asyncio
+import weakref
+from datetime import date, timedelta
+from src.core.config import get_settings
+from src.core.database import AsyncSessionLocal
+from src.core.security.auth import get_stream_user
+from src.services.events import Subscription, event_hub, format_sse
+from src.services.expiry_alerts import expiring_event, items_expiring_on
+from src.services.inventory_version import get_inventory_version
+
+settings = get_settings()
+router = APIRouter()
+
+async def _event_stream(subscription: Subscription):
+    """Eventos del usuario: estado inicial, cambios de inventario y avisos de caducidad"""
+    user_id = subscription.user_id
+    try:
+        # La sesión de la petición ya se ha cerrado: el stream abre la suya, solo para el arranque
+        async with AsyncSessionLocal() as session:
+            version, _ = await get_inventory_version(session, user_id)
+            tomorrow = date.today() + timedelta(days=1)
+            expiring = await items_expiring_on(session, [user_id], tomorrow)
+
+        yield "retry: 5000\n\n"
+        yield format_sse({"type": "ready", "version": version})
+        if expiring:
+            yield format_sse(expiring_event(tomorrow, expiring[user_id]))
+
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield format_sse(message)
+    finally:
+        event_hub.unsubscribe(subscription)
+
+@router.get("/stream")
+async def stream_events(current_user: dict = Depends(get_stream_user)):
+    """Canal SSE con cambios de inventario y avisos de caducidad (sustituye al polling)"""
+    # Suscribirse aquí, y no al empezar el stream: reserva la plaza antes de responder
+    # y no se pierden eventos entre la suscripción y la lectura del estado inicial
+    subscription = event_hub.subscribe(current_user["id"])
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas conexiones de eventos abiertas"
+        )
+
+    stream = _event_stream(subscription)
+    # Si el cliente se va antes de que empiece el stream, el finally del generador no
+    # llega a ejecutarse: la plaza se libera al recolectarlo
+    weakref.finalize(stream, event_hub.unsubscribe, subscription)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
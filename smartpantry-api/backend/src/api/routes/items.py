@@ -1,57 +1,406 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+﻿from fastapi import APIRouter, Body, Depends, HTTPException, Request, status, Query
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from datetime import date, timedelta
-from src.core.database import get_db
+from sqlalchemy import select, and_, insert, update, delete
+from datetime import date, datetime
+import heapq
+import json
+from src.core.config import get_settings
+from src.core.database import get_db, get_write_db, AsyncSessionLocal
+from src.core.rate_limit import limit_per_user
 from src.core.security.auth import get_current_user
-from src.models.schemas import ItemCreate, ItemUpdate, ItemResponse
-from src.models.database_models import PantryItem
+from src.models.schemas import (
+    ItemCreate, ItemUpdate, ItemResponse, InventoryStats,
+    ItemBulkUpdate, ItemBulkDelete, BulkItemResult, BulkOperationResponse, ItemChanges,
+    ItemNutrition, PantryNutrition
+)
+from src.ml.nutrition import build_batch, grade_label, score_batch, summarize, warning_messages
+from src.models.database_models import ItemExpiration, ItemTombstone, PantryItem
+from src.services.barcode import barcode_service, is_valid_barcode
+from src.services.consumption import consumed_event, deleted_event, record_consumption
+from src.services.events import publish_on_commit
+from src.services.expiration_index import ensure_expiration_index, reindex_items
+from src.services.inventory_stats import get_cached_inventory_stats
+from src.services.inventory_version import (
+    bump_inventory_version, get_inventory_version, is_not_modified, since_midnight, validator_headers
+)
+from src.services.item_fields import with_derived_fields, with_derived_fields_many
+from src.services.pagination import (
+    after_sync_cursor, decode_cursor, decode_sync_cursor, encode_cursor, encode_sync_cursor, keyset_after
+)
+from src.services.search import item_search
 
-router = APIRouter()
+settings = get_settings()
+router = APIRouter(dependencies=[Depends(limit_per_user("items", settings.RATE_LIMIT_PER_MINUTE))])
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+MAX_BULK_ITEMS = 500
+REQUIRED_FIELDS = ("name", "category", "quantity", "unit")
+ITEM_FIELDS = tuple(ItemResponse.model_fields)
+# Columnas que describen lo consumido al bajar la cantidad o borrar un item
+DELETED_FIELDS = (
+    PantryItem.id, PantryItem.category, PantryItem.canonical_name, PantryItem.base_quantity, PantryItem.base_unit
+)
+CURRENT_FIELDS = (*DELETED_FIELDS, PantryItem.quantity, PantryItem.unit)
+
+def _selected_fields(fields: Optional[str]) -> List[str]:
+    """Validar la proyección ?fields= (el id se incluye siempre)"""
+    if not fields:
+        return list(ITEM_FIELDS)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(ITEM_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconocidos: {', '.join(unknown)}"
+        )
+    return list(dict.fromkeys(["id", *requested]))
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def _dump_row(row, fields: List[str]) -> str:
+    return json.dumps({name: row[name] for name in fields}, default=_json_default, ensure_ascii=False)
+
+async def _stream_items(query, fields: List[str]):
+    """Emitir filas como NDJSON sin materializar el resultado completo"""
+    # La sesión de get_db se cierra antes de enviar el cuerpo: el stream abre la suya
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.mappings().partitions():
+            yield "".join(_dump_row(row, fields) + "\n" for row in rows)
 
 @router.post("/", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_item(
     item: ItemCreate,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """Crear nuevo item en despensa (requiere autenticación)"""
-    db_item = PantryItem(
-        user_id=current_user["id"],
-        **item.model_dump()
+    version = await bump_inventory_version(db, current_user["id"])
+    # INSERT ... RETURNING devuelve id y valores por defecto sin un SELECT extra
+    db_item = await db.scalar(
+        insert(PantryItem)
+        .values(user_id=current_user["id"], sync_version=version, **with_derived_fields(item.model_dump()))
+        .returning(PantryItem)
     )
-    db.add(db_item)
-    await db.commit()
-    await db.refresh(db_item)
+    if db_item.expiration_date is not None:
+        await reindex_items(db, [db_item.id])
+    _publish_item(db, "item.created", version, db_item)
     return db_item
 
 @router.get("/", response_model=List[ItemResponse])
 async def get_items(
+    request: Request,
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     expiring_soon: bool = Query(False, description="Solo items próximos a vencer"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE,
+        description=f"Tamaño de página (por defecto {DEFAULT_PAGE_SIZE}; sin límite en ndjson)"
+    ),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$", description="json o ndjson (streaming)"),
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Listar items del usuario actual"""
-    query = select(PantryItem).where(PantryItem.user_id == current_user["id"])
+    """Listar items del usuario actual (paginación por cursor)"""
+    selected = _selected_fields(fields)
+    
+    # Petición condicional: con la versión del inventario se responde 304 sin consultar items
+    version, modified = await get_inventory_version(db, current_user["id"])
+    variant = request.url.query
+    if expiring_soon:
+        # La ventana de caducidad se mueve cada día aunque el inventario no cambie
+        today = date.today()
+        variant += f"|{today.isoformat()}"
+        modified = since_midnight(modified, today)
+    headers = validator_headers("items", version, modified, variant=variant)
+    if is_not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # expiration_date e id forman el cursor: se leen aunque no se devuelvan
+    columns = [getattr(PantryItem, name) for name in dict.fromkeys([*selected, "expiration_date"])]
+    query = select(*columns).where(PantryItem.user_id == current_user["id"])
     
     if category:
         query = query.where(PantryItem.category == category)
     
     if expiring_soon:
-        week_from_now = date.today() + timedelta(days=7)
+        # Caducados y próximos a vencer ya están precalculados en item_expirations
+        await ensure_expiration_index(db)
+        query = query.join(ItemExpiration, ItemExpiration.item_id == PantryItem.id)
+    
+    if cursor:
         query = query.where(
+            keyset_after(PantryItem.expiration_date, PantryItem.id, decode_cursor(cursor))
+        )
+    
+    query = query.order_by(PantryItem.expiration_date.asc().nullslast(), PantryItem.id.asc())
+    
+    if output == "ndjson":
+        if limit:
+            query = query.limit(limit)
+        return StreamingResponse(
+            _stream_items(query, selected),
+            media_type="application/x-ndjson",
+            headers=headers
+        )
+    
+    page_size = limit or DEFAULT_PAGE_SIZE
+    result = await db.execute(query.limit(page_size + 1))
+    rows = result.mappings().all()
+    
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["expiration_date"], rows[-1]["id"])
+    
+    body = "[" + ",".join(_dump_row(row, selected) for row in rows) + "]"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def _record_deletions(db: AsyncSession, user_id: int, item_ids) -> int:
+    """Subir la versión y dejar tombstones para que /changes propague las bajas"""
+    version = await bump_inventory_version(db, user_id)
+    await db.execute(
+        insert(ItemTombstone),
+        [{"user_id": user_id, "item_id": item_id, "sync_version": version} for item_id in item_ids]
+    )
+    await reindex_items(db, item_ids)
+    return version
+
+def _publish_item(db: AsyncSession, event_type: str, version: int, db_item: PantryItem) -> None:
+    publish_on_commit(db, db_item.user_id, {
+        "type": event_type,
+        "version": version,
+        "item": ItemResponse.model_validate(db_item).model_dump(mode="json")
+    })
+
+def _publish_inventory_changed(db: AsyncSession, user_id: int, version: int) -> None:
+    # Las operaciones en lote solo avisan: el cliente pide el detalle a /changes
+    publish_on_commit(db, user_id, {"type": "inventory.changed", "version": version})
+
+@router.get("/changes", response_model=ItemChanges)
+async def get_item_changes(
+    since: Optional[str] = Query(None, description="Cursor de la sincronización anterior (vacío: inventario completo)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Altas, modificaciones y bajas desde el cursor (sincronización incremental)"""
+    # El cursor es (versión del inventario, id): a diferencia de updated_at, no depende del
+    # reloj, no comparte segundo entre escrituras y la versión se asigna bajo el bloqueo de la fila del usuario
+    user_id = current_user["id"]
+    position = decode_sync_cursor(since) if since else (0, 0)
+    
+    items = (await db.scalars(
+        select(PantryItem)
+        .where(
+            PantryItem.user_id == user_id,
+            after_sync_cursor(PantryItem.sync_version, PantryItem.id, position)
+        )
+        .order_by(PantryItem.sync_version, PantryItem.id)
+        .limit(limit + 1)
+    )).all()
+    
+    tombstones = []
+    # En la sincronización completa no hay nada que borrar en el cliente
+    if since:
+        tombstones = (await db.execute(
+            select(ItemTombstone.sync_version, ItemTombstone.item_id)
+            .where(
+                ItemTombstone.user_id == user_id,
+                after_sync_cursor(ItemTombstone.sync_version, ItemTombstone.item_id, position)
+            )
+            .order_by(ItemTombstone.sync_version, ItemTombstone.item_id)
+            .limit(limit + 1)
+        )).all()
+    
+    changes = list(heapq.merge(
+        ((item.sync_version, item.id, item) for item in items),
+        ((version, item_id, None) for version, item_id in tombstones),
+        key=lambda change: change[:2]
+    ))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    
+    alive = [item for _, _, item in changes if item is not None]
+    alive_ids = {item.id for item in alive}
+    # Un id reutilizado tras una baja solo aparece como alta
+    deleted = list(dict.fromkeys(
+        item_id for _, item_id, item in changes if item is None and item_id not in alive_ids
+    ))
+    cursor = encode_sync_cursor(*changes[-1][:2]) if changes else encode_sync_cursor(*position)
+    return ItemChanges(items=alive, deleted=deleted, cursor=cursor, has_more=has_more)
+
+@router.get("/search", response_model=List[ItemResponse])
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto a buscar en el nombre"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Buscar items por nombre: subcadena, sin distinguir tildes ni mayúsculas (typeahead)"""
+    return await item_search.search(db, current_user["id"], q, limit)
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+def _bulk_response(results: List[BulkItemResult]) -> BulkOperationResponse:
+    results.sort(key=lambda result: result.index)
+    failed = sum(1 for result in results if result.status in ("invalid", "not_found"))
+    return BulkOperationResponse(succeeded=len(results) - failed, failed=failed, results=results)
+
+@router.post("/bulk", response_model=BulkOperationResponse)
+async def create_items_bulk(
+    payload: List[Dict[str, Any]] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_db)
+):
+    """Crear varios items en una sola transacción (un único INSERT multi-fila)"""
+    results, rows, indexes = [], [], []
+    for index, raw in enumerate(payload):
+        try:
+            item = ItemCreate.model_validate(raw)
+        except ValidationError as exc:
+            results.append(BulkItemResult(index=index, status="invalid", detail=_validation_detail(exc)))
+            continue
+        rows.append({"user_id": current_user["id"], **item.model_dump()})
+        indexes.append(index)
+    
+    if rows:
+        with_derived_fields_many(rows)
+        version = await bump_inventory_version(db, current_user["id"])
+        for row in rows:
+            row["sync_version"] = version
+        created = await db.scalars(
+            insert(PantryItem).returning(PantryItem, sort_by_parameter_order=True),
+            rows
+        )
+        created = created.all()
+        for index, db_item in zip(indexes, created):
+            results.append(BulkItemResult(
+                index=index,
+                id=db_item.id,
+                status="created",
+                item=ItemResponse.model_validate(db_item)
+            ))
+        await reindex_items(db, [db_item.id for db_item in created if db_item.expiration_date is not None])
+        _publish_inventory_changed(db, current_user["id"], version)
+    
+    return _bulk_response(results)
+
+@router.patch("/bulk", response_model=BulkOperationResponse)
+async def update_items_bulk(
+    payload: List[Dict[str, Any]] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_db)
+):
+    """Actualizar varios items (cada entrada lleva su id) en una sola transacción"""
+    results, changes = [], {}
+    for index, raw in enumerate(payload):
+        try:
+            change = ItemBulkUpdate.model_validate(raw)
+        except ValidationError as exc:
+            results.append(BulkItemResult(index=index, status="invalid", detail=_validation_detail(exc)))
+            continue
+        fields = change.model_dump(exclude_unset=True, exclude={"id"})
+        nulls = [name for name in REQUIRED_FIELDS if name in fields and fields[name] is None]
+        if change.id in changes or nulls:
+            detail = "id duplicado en el lote" if change.id in changes else f"Campos obligatorios nulos: {', '.join(nulls)}"
+            results.append(BulkItemResult(index=index, id=change.id, status="invalid", detail=detail))
+            continue
+        changes[change.id] = (index, fields)
+    
+    if changes:
+        # Valores guardados: la cantidad base depende de cantidad y unidad, y el consumo del valor anterior
+        owned = {row.id: row for row in (await db.execute(
+            select(*CURRENT_FIELDS).where(
+                and_(
+                    PantryItem.id.in_(changes),
+                    PantryItem.user_id == current_user["id"]
+                )
+            )
+        )).all()}
+        
+        rows = [
+            {"id": item_id, **fields}
+            for item_id, (_, fields) in changes.items()
+            if item_id in owned and fields
+        ]
+        with_derived_fields_many(rows, [(owned[row["id"]].quantity, owned[row["id"]].unit) for row in rows])
+        if rows:
+            version = await bump_inventory_version(db, current_user["id"])
+            for row in rows:
+                row["sync_version"] = version
+            # UPDATE por clave primaria con executemany
+            await db.execute(update(PantryItem), rows)
+            await record_consumption(db, [
+                consumed_event(current_user["id"], row["id"], owned[row["id"]], row) for row in rows
+            ])
+            await reindex_items(db, [row["id"] for row in rows if "expiration_date" in row])
+            _publish_inventory_changed(db, current_user["id"], version)
+        
+        updated = await db.scalars(
+            select(PantryItem)
+            .where(PantryItem.id.in_(list(owned)))
+            .execution_options(populate_existing=True)
+        )
+        for db_item in updated:
+            results.append(BulkItemResult(
+                index=changes[db_item.id][0],
+                id=db_item.id,
+                status="updated",
+                item=ItemResponse.model_validate(db_item)
+            ))
+        for item_id in set(changes) - owned.keys():
+            results.append(BulkItemResult(
+                index=changes[item_id][0],
+                id=item_id,
+                status="not_found",
+                detail="Item no encontrado"
+            ))
+    
+    return _bulk_response(results)
+
+@router.delete("/bulk", response_model=BulkOperationResponse)
+async def delete_items_bulk(
+    payload: ItemBulkDelete,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_db)
+):
+    """Eliminar varios items con un único DELETE"""
+    result = await db.execute(
+        delete(PantryItem)
+        .where(
             and_(
-                PantryItem.expiration_date.isnot(None),
-                PantryItem.expiration_date <= week_from_now
+                PantryItem.id.in_(payload.ids),
+                PantryItem.user_id == current_user["id"]
             )
         )
+        .returning(*DELETED_FIELDS)
+    )
+    rows = result.all()
+    deleted = {row.id for row in rows}
+    if deleted:
+        version = await _record_deletions(db, current_user["id"], deleted)
+        await record_consumption(db, [deleted_event(current_user["id"], row) for row in rows])
+        _publish_inventory_changed(db, current_user["id"], version)
     
-    query = query.order_by(PantryItem.expiration_date.asc().nullslast())
-    result = await db.execute(query)
-    items = result.scalars().all()
-    return items
+    return _bulk_response([
+        BulkItemResult(index=index, id=item_id, status="deleted")
+        if item_id in deleted else
+        BulkItemResult(index=index, id=item_id, status="not_found", detail="Item no encontrado")
+        for index, item_id in enumerate(payload.ids)
+    ])
 
 @router.get("/{item_id}", response_model=ItemResponse)
 async def get_item(
@@ -83,18 +432,32 @@ async def update_item(
     item_id: int,
     item_update: ItemUpdate,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """Actualizar item"""
-    result = await db.execute(
-        select(PantryItem).where(
-            and_(
-                PantryItem.id == item_id,
-                PantryItem.user_id == current_user["id"]
-            )
-        )
+    owned = and_(
+        PantryItem.id == item_id,
+        PantryItem.user_id == current_user["id"]
     )
-    item = result.scalar_one_or_none()
+    update_data = item_update.model_dump(exclude_unset=True)
+    
+    current = None
+    if update_data:
+        if "quantity" in update_data or "unit" in update_data:
+            # La cantidad base depende de ambas, y el consumo del valor anterior
+            current = (await db.execute(select(*CURRENT_FIELDS).where(owned))).first()
+        with_derived_fields(update_data, (current.quantity, current.unit) if current else None)
+        # Si el item no existe, el 404 deshace también el incremento de versión
+        version = await bump_inventory_version(db, current_user["id"])
+        item = await db.scalar(
+            update(PantryItem)
+            .where(owned)
+            .values(sync_version=version, **update_data)
+            .returning(PantryItem)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        item = await db.scalar(select(PantryItem).where(owned))
     
     if not item:
         raise HTTPException(
@@ -102,92 +465,103 @@ async def update_item(
             detail="Item no encontrado"
         )
     
-    update_data = item_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(item, field, value)
-    
-    await db.commit()
-    await db.refresh(item)
+    if current is not None:
+        await record_consumption(db, [consumed_event(current_user["id"], item_id, current, update_data)])
+    if "expiration_date" in update_data:
+        await reindex_items(db, [item_id])
+    if update_data:
+        _publish_item(db, "item.updated", version, item)
     return item
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_item(
     item_id: int,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """Eliminar item"""
-    result = await db.execute(
-        select(PantryItem).where(
+    deleted = (await db.execute(
+        delete(PantryItem)
+        .where(
             and_(
                 PantryItem.id == item_id,
                 PantryItem.user_id == current_user["id"]
             )
         )
-    )
-    item = result.scalar_one_or_none()
+        .returning(*DELETED_FIELDS)
+        .execution_options(synchronize_session=False)
+    )).first()
     
-    if not item:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item no encontrado"
         )
     
-    await db.delete(item)
-    await db.commit()
+    deleted_id = deleted.id
+    version = await _record_deletions(db, current_user["id"], [deleted_id])
+    await record_consumption(db, [deleted_event(current_user["id"], deleted)])
+    publish_on_commit(db, current_user["id"], {"type": "item.deleted", "version": version, "id": deleted_id})
 
-@router.get("/stats/summary")
+@router.get("/stats/summary", response_model=InventoryStats)
 async def get_inventory_stats(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Obtener estadísticas del inventario"""
-    from sqlalchemy import func
-    
-    # Total items
-    total_result = await db.execute(
-        select(func.count(PantryItem.id)).where(
-            PantryItem.user_id == current_user["id"]
-        )
+    version, modified = await get_inventory_version(db, current_user["id"])
+    # Las cifras de caducidad cambian a medianoche aunque el inventario no cambie
+    today = date.today()
+    headers = validator_headers(
+        "stats",
+        version,
+        since_midnight(modified, today),
+        variant=today.isoformat()
     )
-    total_items = total_result.scalar()
+    if is_not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    # Items por categoría
-    category_result = await db.execute(
-        select(PantryItem.category, func.count(PantryItem.id))
+    response.headers.update(headers)
+    return await get_cached_inventory_stats(db, current_user["id"], version)
+
+@router.get("/stats/nutrition", response_model=PantryNutrition)
+async def get_pantry_nutrition(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Puntuación nutricional de toda la despensa (productos resueltos por código de barras)"""
+    result = await db.execute(
+        select(PantryItem.id, PantryItem.name, PantryItem.barcode)
         .where(PantryItem.user_id == current_user["id"])
-        .group_by(PantryItem.category)
-    )
-    items_by_category = {cat: count for cat, count in category_result.all()}
-    
-    # Items próximos a vencer
-    week_from_now = date.today() + timedelta(days=7)
-    expiring_result = await db.execute(
-        select(func.count(PantryItem.id)).where(
-            and_(
-                PantryItem.user_id == current_user["id"],
-                PantryItem.expiration_date <= week_from_now,
-                PantryItem.expiration_date.isnot(None)
-            )
-        )
+        .order_by(PantryItem.id)
     )
-    expiring_soon = expiring_result.scalar()
-    
-    # Items expirados
-    expired_result = await db.execute(
-        select(func.count(PantryItem.id)).where(
-            and_(
-                PantryItem.user_id == current_user["id"],
-                PantryItem.expiration_date < date.today(),
-                PantryItem.expiration_date.isnot(None)
+    rows = result.all()
+    # Open Food Facts puede tardar segundos por código: no retener la conexión mientras tanto
+    await db.close()
+    with_barcode = [row for row in rows if row.barcode and is_valid_barcode(row.barcode)]
+
+    # Los productos ya escaneados salen de la caché local; el resto se resuelve en paralelo
+    products = await barcode_service.lookup_many(row.barcode for row in with_barcode)
+    scored = [(row, products[row.barcode]) for row in with_barcode if isinstance(products[row.barcode], dict)]
+
+    batch = build_batch(product for _, product in scored)
+    scores, warnings = score_batch(batch)
+    return PantryNutrition(
+        scored_items=len(scored),
+        unscored_items=len(rows) - len(scored),
+        items=[
+            ItemNutrition(
+                item_id=row.id,
+                name=row.name,
+                barcode=row.barcode,
+                score=int(scores[i]),
+                nutriscore_grade=grade_label(int(batch.grades[i])),
+                nova_group=int(batch.nova[i]) or None,
+                warnings=warning_messages(int(warnings[i])),
             )
-        )
+            for i, (row, _) in enumerate(scored)
+        ],
+        **summarize(batch, scores, warnings)
     )
-    expired = expired_result.scalar()
-    
-    return {
-        "total_items": total_items,
-        "items_by_category": items_by_category,
-        "expiring_soon": expiring_soon,
-        "expired_items": expired
-    }
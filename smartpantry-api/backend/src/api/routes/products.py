@@ -0,0 +1,84 @@
+﻿from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from src.core.config import get_settings
+from src.core.rate_limit import limit_per_user
+from src.core.security.auth import get_current_user
+from src.models.schemas import BarcodeBatchRequest, BarcodeBatchResponse, BarcodeLookupResult, ProductInfo
+from src.services.barcode import BarcodeLookupError, barcode_service, is_valid_barcode
+
+settings = get_settings()
+router = APIRouter(dependencies=[Depends(limit_per_user("products", settings.RATE_LIMIT_PER_MINUTE))])
+
+def _to_product(barcode: str, product: dict) -> ProductInfo:
+    """Convertir el producto compacto de Open Food Facts a ProductInfo"""
+    categories = product.get("categories") or ""
+    return ProductInfo(
+        barcode=barcode,
+        name=product.get("product_name"),
+        brand=product.get("brands"),
+        categories=[category.strip() for category in categories.split(",") if category.strip()],
+        quantity=product.get("quantity"),
+        nutriscore_grade=product.get("nutriscore_grade"),
+        nova_group=product.get("nova_group"),
+        ingredients_text=product.get("ingredients_text_es"),
+        additives=product.get("additives_tags", []),
+        image_url=product.get("image_small_url"),
+        nutriments=product.get("nutriments", {}),
+    )
+
+def _result(barcode: str, product: Optional[object]) -> BarcodeLookupResult:
+    if isinstance(product, BarcodeLookupError):
+        return BarcodeLookupResult(barcode=barcode, status="error")
+    if isinstance(product, BaseException):
+        raise product
+    if product is None:
+        return BarcodeLookupResult(barcode=barcode, status="not_found")
+    return BarcodeLookupResult(barcode=barcode, status="found", product=_to_product(barcode, product))
+
+@router.get("/{barcode}", response_model=ProductInfo)
+async def get_product(
+    barcode: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Resolver un código de barras (caché local primero, Open Food Facts si falta)"""
+    if not is_valid_barcode(barcode):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Código de barras inválido (8 a 14 dígitos)"
+        )
+
+    try:
+        product = await barcode_service.lookup(barcode)
+    except BarcodeLookupError:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="No se pudo consultar Open Food Facts"
+        )
+
+    if product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Producto no encontrado"
+        )
+    return _to_product(barcode, product)
+
+@router.post("/batch", response_model=BarcodeBatchResponse)
+async def lookup_products(
+    batch: BarcodeBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Resolver varios códigos a la vez; los fallos se informan por código, no abortan el lote"""
+    valid = [barcode for barcode in batch.barcodes if is_valid_barcode(barcode)]
+    products = await barcode_service.lookup_many(valid)
+
+    results = []
+    for barcode in dict.fromkeys(batch.barcodes):
+        if barcode in products:
+            results.append(_result(barcode, products[barcode]))
+        else:
+            results.append(BarcodeLookupResult(barcode=barcode, status="invalid"))
+
+    return BarcodeBatchResponse(
+        found=sum(result.status == "found" for result in results),
+        results=results
+    )
@@ -1,29 +1,170 @@
-﻿from fastapi import APIRouter, Depends
-from typing import List
-from src.models.schemas import RecipeResponse
+﻿from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+import json
+from src.core.config import get_settings
+from src.core.database import get_db
+from src.core.rate_limit import limit_per_user
+from src.core.security.auth import get_current_user
+from src.models.schemas import AISuggestions, DietEnum, RecipeResponse
+from src.models.database_models import PantryItem, Recipe, RecipeIngredient, RecipeTag
+from src.services.ai_suggestions import SuggestionRequest, build_request, suggestion_service
+from src.services.diet import compatible_diets, diet_mask
+from src.services.events import format_sse
+from src.services.llm import LLMError, LLMNotConfigured, llm_client
+from src.services.normalization import fold_text, normalize_ingredient
+from src.services.recipe_matcher import RecipeMatch, recipe_index
 
+settings = get_settings()
 router = APIRouter()
 
+def _to_response(recipe: Recipe, match: Optional[RecipeMatch] = None) -> RecipeResponse:
+    """Convertir receta ORM (con ingredientes y tags) a RecipeResponse"""
+    return RecipeResponse(
+        id=recipe.id,
+        name=recipe.name,
+        description=recipe.description,
+        ingredients=[ingredient.name for ingredient in recipe.ingredients],
+        instructions=json.loads(recipe.instructions),
+        prep_time=recipe.prep_time,
+        cook_time=recipe.cook_time,
+        servings=recipe.servings,
+        difficulty=recipe.difficulty,
+        cuisine=recipe.cuisine,
+        tags=[tag.name for tag in recipe.tags],
+        created_at=recipe.created_at,
+        match_percentage=match.match_percentage if match else None,
+        missing_ingredients=match.missing_ingredients if match else [],
+        diets=compatible_diets(recipe.diet_flags),
+    )
+
 @router.get("/", response_model=List[RecipeResponse])
-async def get_recipes():
+async def get_recipes(
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de recetas"),
+    min_match: float = Query(0, ge=0, le=100, description="Porcentaje mínimo de coincidencia"),
+    diet: List[DietEnum] = Query(default=[], description="Dietas que deben respetar (todas)"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     """Obtener recetas sugeridas basadas en inventario"""
-    # TODO: Implementar lógica de matching con IA
+    # Claves canónicas calculadas al escribir (en el índice, normalizarlas de nuevo es un acierto de caché)
+    result = await db.execute(
+        select(PantryItem.canonical_name).where(PantryItem.user_id == current_user["id"])
+    )
+    pantry = result.scalars().all()
+    
+    # El índice invertido resuelve el ranking; solo se cargan las recetas ganadoras
+    matches = recipe_index.match(
+        pantry,
+        limit=limit,
+        min_percentage=min_match,
+        diet_mask=diet_mask(d.value for d in diet)
+    )
+    if not matches:
+        return []
+    
+    result = await db.execute(
+        select(Recipe).where(Recipe.id.in_([m.recipe_id for m in matches]))
+    )
+    recipes = {recipe.id: recipe for recipe in result.scalars()}
     return [
-        {
-            "id": 1,
-            "name": "Pasta con tomate",
-            "ingredients": ["pasta", "tomate", "ajo"],
-            "instructions": ["Hervir pasta", "Preparar salsa", "Mezclar"],
-            "prep_time": 20,
-            "difficulty": "easy",
-            "match_percentage": 85.0
-        }
+        _to_response(recipes[m.recipe_id], m)
+        for m in matches
+        if m.recipe_id in recipes
     ]
 
-@router.get("/ai-suggestions")
-async def get_ai_recipe_suggestions():
-    """Sugerencias de recetas usando IA"""
-    return {
-        "message": "Endpoint para integración con OpenAI GPT-4",
-        "status": "pending_implementation"
-    }
+@router.get("/search", response_model=List[RecipeResponse])
+async def search_recipes(
+    ingredient: List[str] = Query(default=[], description="Ingredientes requeridos (todos)"),
+    tag: List[str] = Query(default=[], description="Tags requeridos (todos)"),
+    diet: List[DietEnum] = Query(default=[], description="Dietas que deben respetar (todas)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Buscar recetas que contengan todos los ingredientes y tags indicados"""
+    query = select(Recipe)
+    
+    # Un único predicado a nivel de bits sobre la columna precalculada
+    mask = diet_mask(d.value for d in diet)
+    if mask:
+        query = query.where(Recipe.diet_flags.op("&")(mask) == 0)
+    
+    # Cada filtro es un GROUP BY sobre el índice (normalized_name, recipe_id)
+    ingredient_keys = {normalize_ingredient(name) for name in ingredient if name.strip()}
+    if ingredient_keys:
+        query = query.where(Recipe.id.in_(
+            select(RecipeIngredient.recipe_id)
+            .where(RecipeIngredient.normalized_name.in_(ingredient_keys))
+            .group_by(RecipeIngredient.recipe_id)
+            .having(func.count(func.distinct(RecipeIngredient.normalized_name)) == len(ingredient_keys))
+        ))
+    
+    tag_keys = {fold_text(name) for name in tag if name.strip()}
+    if tag_keys:
+        query = query.where(Recipe.id.in_(
+            select(RecipeTag.recipe_id)
+            .where(RecipeTag.normalized_name.in_(tag_keys))
+            .group_by(RecipeTag.recipe_id)
+            .having(func.count(func.distinct(RecipeTag.normalized_name)) == len(tag_keys))
+        ))
+    
+    result = await db.execute(query.order_by(Recipe.id).limit(limit))
+    return [_to_response(recipe) for recipe in result.scalars()]
+
+async def _suggestion_stream(request: SuggestionRequest):
+    """Eventos token, recipe (ya validada contra RecipeBase) y done/error"""
+    async for message in suggestion_service.stream(request):
+        yield format_sse(message)
+
+@router.get(
+    "/ai-suggestions",
+    response_model=AISuggestions,
+    dependencies=[Depends(limit_per_user("ai", settings.AI_SUGGESTIONS_PER_MINUTE))]
+)
+async def get_ai_recipe_suggestions(
+    diet: List[DietEnum] = Query(default=[], description="Dietas que deben respetar (todas)"),
+    servings: int = Query(2, ge=1, le=20),
+    stream: bool = Query(False, description="Enviar fragmentos y recetas por SSE según se generan"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sugerencias de recetas generadas por el LLM a partir de la despensa"""
+    result = await db.execute(
+        select(PantryItem.name).where(PantryItem.user_id == current_user["id"])
+    )
+    request = build_request(result.scalars().all(), (d.value for d in diet), servings)
+    # La generación puede tardar decenas de segundos: no retener la conexión mientras tanto
+    await db.close()
+    if not request.ingredients:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La despensa está vacía"
+        )
+    
+    if stream:
+        if not llm_client.is_configured:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de IA no configurado"
+            )
+        return StreamingResponse(
+            _suggestion_stream(request),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    try:
+        recipes, cached = await suggestion_service.suggest(request)
+    except LLMNotConfigured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de IA no configurado"
+        )
+    except LLMError:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="No se pudieron generar sugerencias"
+        )
+    return AISuggestions(recipes=recipes, cached=cached)
@@ -0,0 +1,24 @@
+﻿from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import get_settings
+from src.core.database import get_db
+from src.core.rate_limit import limit_per_user
+from src.core.security.auth import get_current_user
+from src.models.schemas import ShoppingPlan, ShoppingPlanRequest
+from src.services.shopping import plan_shopping
+
+settings = get_settings()
+router = APIRouter(dependencies=[Depends(limit_per_user("shopping", settings.RATE_LIMIT_PER_MINUTE))])
+
+@router.post("/plan", response_model=ShoppingPlan)
+async def create_shopping_plan(
+    plan: ShoppingPlanRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Lista de la compra: lo que falta en la despensa para cocinar las recetas indicadas
+
+    Los ingredientes repetidos entre recetas se suman (convirtiendo entre
+    masa y volumen cuando se conoce la densidad) y se restan las existencias.
+    """
+    return await plan_shopping(db, current_user["id"], plan.recipe_ids, plan.servings_multiplier)
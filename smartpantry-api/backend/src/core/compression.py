@@ -0,0 +1,16 @@
+﻿from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZip que deja pasar sin comprimir las peticiones de text/event-stream
+
+    El compresor retiene los bytes hasta llenar su bloque, y los eventos SSE
+    llegarían con retraso. EventSource siempre envía Accept: text/event-stream.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "text/event-stream" in Headers(scope=scope).get("accept", ""):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
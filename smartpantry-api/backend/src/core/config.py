@@ -11,14 +11,86 @@ class Settings(BaseSettings):
     
     DATABASE_URL: str = "sqlite+aiosqlite:///./smartpantry.db"
     
+    # Perfil de rendimiento SQLite (se aplica en cada conexión)
+    SQLITE_TUNING_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KIB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    
+    # Pool de conexiones
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Hash de contraseñas (scrypt, N = 2**ROUNDS) en un pool de hilos
+    PASSWORD_SCRYPT_ROUNDS: int = 15
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
+    # Caché de tokens verificados y usuario autenticado
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Rate limiting (token bucket; sqlite = compartido entre workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.db"
+    RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 10
+    
     # CORS permitiendo todas las conexiones (desarrollo)
     ALLOWED_ORIGINS: list = ["*"]
     
+    # Sugerencias de recetas con LLM (mismas variables que llmClient.ts)
+    LLM_PROVIDER: str = "ollama"
+    LLM_MODEL: str = "phi3:3.8b-instruct-q4_K_M"
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 10
+    LLM_TEMPERATURE: float = 0.5
+    AI_SUGGESTIONS_COUNT: int = 3
+    AI_SUGGESTIONS_CACHE_TTL_SECONDS: int = 21600
+    AI_SUGGESTIONS_CACHE_MAX_ENTRIES: int = 1000
+    AI_SUGGESTIONS_PER_MINUTE: int = 5
+    
+    # Caché de estadísticas de inventario (por usuario)
+    STATS_CACHE_TTL_SECONDS: int = 60
+    STATS_CACHE_MAX_USERS: int = 10000
+    
+    # Agregados diarios de consumo (tendencias de /analytics/consumption)
+    CONSUMPTION_ROLLUP_INTERVAL_SECONDS: int = 60
+    CONSUMPTION_ROLLUP_BATCH_SIZE: int = 5000
+    
+    # Eventos en tiempo real (SSE)
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_MAX_STREAMS_PER_USER: int = 5
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EXPIRY_ALERT_HOUR: int = 9
+    
+    # Productos por código de barras (Open Food Facts) con caché SQLite local
+    OFF_BASE_URL: str = "https://world.openfoodfacts.org"
+    OFF_TIMEOUT_SECONDS: float = 5.0
+    OFF_MAX_CONNECTIONS: int = 20
+    OFF_USER_AGENT: str = "SmartPantry/1.0"
+    PRODUCT_CACHE_PATH: str = "./products_cache.db"
+    PRODUCT_CACHE_TTL_SECONDS: int = 604800
+    PRODUCT_CACHE_NOT_FOUND_TTL_SECONDS: int = 86400
+    PRODUCT_CACHE_MAX_ENTRIES: int = 50000
+    
+    # Métricas de peticiones (/metrics) y log muestreado
+    METRICS_ENABLED: bool = True
+    METRICS_LOG_SAMPLE_RATE: float = 0.01
+    METRICS_SLOW_REQUEST_MS: int = 1000
     
     class Config:
         env_file = ".env"
@@ -1,16 +1,50 @@
-﻿from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+﻿from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
 from .config import get_settings
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True
-)
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Perfil SQLite: WAL + synchronous=NORMAL permiten lecturas concurrentes con una escritura"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    # Valor negativo = tamaño en KiB en lugar de páginas
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KIB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def build_engine(url: str, sqlite_tuning: bool = True) -> AsyncEngine:
+    """Crear el engine con el pool acotado y, en SQLite, el perfil de PRAGMAs"""
+    options = {"echo": False, "future": True}
+    is_sqlite = url.startswith("sqlite")
+    
+    # SQLite en memoria usa un pool estático: no admite tamaño ni overflow
+    if not (is_sqlite and ":memory:" in url):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    if not is_sqlite:
+        options.update(
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    
+    async_engine = create_async_engine(url, **options)
+    if is_sqlite and sqlite_tuning:
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return async_engine
+
+engine = build_engine(settings.DATABASE_URL, sqlite_tuning=settings.SQLITE_TUNING_ENABLED)
 
 AsyncSessionLocal = sessionmaker(
     engine,
@@ -31,6 +65,20 @@ async def get_db():
         finally:
             await session.close()
 
+async def get_write_db():
+    """Sesión unit-of-work para rutas de escritura: una transacción y un único COMMIT"""
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            yield session
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+def _run_migrations(connection):
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
 async def init_db():
+    """Aplicar migraciones pendientes (equivale a `alembic upgrade head`)"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_run_migrations)
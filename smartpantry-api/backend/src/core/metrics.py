@@ -0,0 +1,181 @@
+﻿import bisect
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Límites de los buckets de latencia (segundos), como los de los clientes Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_BUCKET_BOUNDS_NS = [int(bound * 1e9) for bound in LATENCY_BUCKETS]
+
+# (consultas, ns en base de datos) de la petición en curso
+_db_usage: ContextVar[Optional[List[int]]] = ContextVar("db_usage", default=None)
+
+
+class Histogram:
+    """Histograma de latencias en nanosegundos con buckets fijos"""
+
+    __slots__ = ("buckets", "count", "total_ns")
+
+    def __init__(self):
+        self.buckets = [0] * (len(_BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+
+    def observe(self, value_ns: int) -> None:
+        self.buckets[bisect.bisect_left(_BUCKET_BOUNDS_NS, value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Métricas del proceso (cada worker de uvicorn expone las suyas); solo desde el event loop"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.db_queries: Dict[Tuple[str, str], int] = {}
+        self.db_time_ns: Dict[Tuple[str, str], int] = {}
+
+    def record(self, method: str, route: str, status_code: int, elapsed_ns: int, queries: int, db_ns: int) -> None:
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(elapsed_ns)
+        status_key = (method, route, status_code)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+        self.db_queries[key] = self.db_queries.get(key, 0) + queries
+        self.db_time_ns[key] = self.db_time_ns.get(key, 0) + db_ns
+
+    def render(self) -> str:
+        """Exportar en formato de texto de Prometheus"""
+        lines = [
+            "# HELP smartpantry_http_request_duration_seconds Latencia de las peticiones HTTP por ruta",
+            "# TYPE smartpantry_http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{_label(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'smartpantry_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'smartpantry_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"smartpantry_http_request_duration_seconds_sum{{{labels}}} {histogram.total_ns / 1e9}")
+            lines.append(f"smartpantry_http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP smartpantry_http_responses_total Respuestas por ruta y código de estado",
+            "# TYPE smartpantry_http_responses_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.responses.items()):
+            lines.append(
+                f'smartpantry_http_responses_total{{method="{method}",route="{_label(route)}",status="{status_code}"}} {count}'
+            )
+
+        lines += [
+            "# HELP smartpantry_http_requests_in_flight Peticiones en curso",
+            "# TYPE smartpantry_http_requests_in_flight gauge",
+            f"smartpantry_http_requests_in_flight {self.in_flight}",
+            "# HELP smartpantry_db_queries_total Consultas SQL ejecutadas por ruta",
+            "# TYPE smartpantry_db_queries_total counter",
+        ]
+        for (method, route), count in sorted(self.db_queries.items()):
+            lines.append(f'smartpantry_db_queries_total{{method="{method}",route="{_label(route)}"}} {count}')
+
+        lines += [
+            "# HELP smartpantry_db_query_seconds_total Tiempo en base de datos por ruta",
+            "# TYPE smartpantry_db_query_seconds_total counter",
+        ]
+        for (method, route), total_ns in sorted(self.db_time_ns.items()):
+            lines.append(f'smartpantry_db_query_seconds_total{{method="{method}",route="{_label(route)}"}} {total_ns / 1e9}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _db_usage.get() is not None:
+        conn.info["metrics_query_start_ns"] = time.perf_counter_ns()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    usage = _db_usage.get()
+    start = conn.info.pop("metrics_query_start_ns", None)
+    if usage is not None and start is not None:
+        usage[0] += 1
+        usage[1] += time.perf_counter_ns() - start
+
+
+def _route_label(scope) -> str:
+    # Plantilla de la ruta ("/api/v1/items/{item_id}") para acotar la cardinalidad
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        return scope["path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: latencia por ruta, peticiones en curso y uso de base de datos
+
+    El log por petición es muestreado (sample_rate) salvo las peticiones lentas,
+    que se registran siempre.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.01, slow_request_ms: int = 1000):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_ns = slow_request_ms * 1_000_000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        usage = [0, 0]
+        token = _db_usage.set(usage)
+        status_code = 500
+        registry.in_flight += 1
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{(time.perf_counter_ns() - start) / 1e9:.6f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start
+            registry.in_flight -= 1
+            _db_usage.reset(token)
+            route = _route_label(scope)
+            registry.record(scope["method"], route, status_code, elapsed_ns, usage[0], usage[1])
+            if elapsed_ns >= self.slow_request_ns or random.random() < self.sample_rate:
+                logger.info(
+                    "%s %s - Status: %d - Time: %.1fms - DB: %d consultas / %.1fms",
+                    scope["method"], route, status_code, elapsed_ns / 1e6, usage[0], usage[1] / 1e6,
+                )
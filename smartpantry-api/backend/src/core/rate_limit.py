@@ -0,0 +1,171 @@
+﻿import asyncio
+import logging
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.core.security.auth import get_current_user
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Resultado de consumir un token: (permitido, segundos hasta el siguiente token)
+Decision = Tuple[bool, float]
+
+
+class MemoryTokenBucketStore:
+    """Token bucket en memoria del proceso (sin locks: solo desde el event loop)
+
+    Un bucket que caduca equivale a uno lleno, así que la TTL de cada entrada
+    es el tiempo de recarga completa y la caché se limpia sola.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self._buckets = TTLCache(maxsize=max_keys, ttl=60)
+
+    def hit(self, key: str, rate: float, capacity: int) -> Decision:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets.set(key, (tokens, now), ttl=capacity / rate)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    async def check(self, key: str, rate: float, capacity: int) -> Decision:
+        return self.hit(key, rate, capacity)
+
+
+class SQLiteTokenBucketStore:
+    """Token bucket compartido entre workers en un fichero SQLite local
+
+    Cada comprobación es un único UPSERT atómico: la recarga y el consumo se
+    calculan dentro de SQLite, sin leer-modificar-escribir entre procesos.
+    Desde la API se llama con check(), que lo ejecuta en un hilo propio: con
+    escrituras concurrentes el busy timeout espera allí y no en el event loop.
+    """
+
+    _PRUNE_EVERY = 1000
+    # Ningún límite configurado tarda más de esto en recargarse por completo
+    _STALE_AFTER_SECONDS = 3600
+
+    _UPSERT = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+        VALUES (:key, :capacity - 1, :now)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + max(:now - updated_at, 0) * :rate) - 1,
+            updated_at = :now
+        WHERE min(:capacity, tokens + max(:now - updated_at, 0) * :rate) >= 1
+        RETURNING tokens
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 100):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits = 0
+        # Un solo hilo: la conexión se usa siempre desde él y las comprobaciones se encolan
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión perezosa: cada worker abre la suya después de arrancar
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                timeout=self.busy_timeout_ms / 1000,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Perder contadores en un corte de luz es aceptable
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    def hit(self, key: str, rate: float, capacity: int) -> Decision:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            self._UPSERT, {"key": key, "capacity": capacity, "rate": rate, "now": now}
+        ).fetchone()
+
+        self._hits += 1
+        if self._hits % self._PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM rate_limit_buckets WHERE updated_at < ?",
+                (now - self._STALE_AFTER_SECONDS,),
+            )
+
+        if row is not None:
+            return True, 0.0
+        tokens, updated_at = conn.execute(
+            "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        tokens = min(capacity, tokens + max(now - updated_at, 0) * rate)
+        return False, (1 - tokens) / rate
+
+    async def check(self, key: str, rate: float, capacity: int) -> Decision:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.hit, key, rate, capacity)
+
+
+def build_rate_limit_store():
+    """Crear el almacén configurado (memory: un proceso; sqlite: varios workers)"""
+    if settings.RATE_LIMIT_STORAGE == "sqlite":
+        return SQLiteTokenBucketStore(settings.RATE_LIMIT_SQLITE_PATH)
+    if settings.RATE_LIMIT_STORAGE != "memory":
+        raise ValueError(f"RATE_LIMIT_STORAGE desconocido: {settings.RATE_LIMIT_STORAGE}")
+    return MemoryTokenBucketStore()
+
+
+rate_limit_store = build_rate_limit_store()
+
+
+async def _enforce(key: str, per_minute: int, burst: Optional[int]) -> None:
+    try:
+        allowed, retry_after = await rate_limit_store.check(key, per_minute / 60, burst or per_minute)
+    except sqlite3.Error as exc:
+        # Si el almacén compartido falla se deja pasar la petición en vez de tumbar la API
+        logger.warning("Rate limit no disponible: %s", exc)
+        return
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas peticiones, inténtalo más tarde",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def limit_per_user(scope: str, per_minute: int, burst: Optional[int] = None):
+    """Dependencia que limita por usuario autenticado (reutiliza get_current_user de la petición)"""
+
+    async def dependency(current_user: dict = Depends(get_current_user)):
+        if settings.RATE_LIMIT_ENABLED:
+            await _enforce(f"{scope}:user:{current_user['id']}", per_minute, burst)
+
+    return dependency
+
+
+def limit_per_ip(scope: str, per_minute: int, burst: Optional[int] = None):
+    """Dependencia que limita por IP, para endpoints sin autenticar"""
+
+    async def dependency(request: Request):
+        if settings.RATE_LIMIT_ENABLED:
+            client = request.client.host if request.client else "unknown"
+            await _enforce(f"{scope}:ip:{client}", per_minute, burst)
+
+    return dependency
@@ -0,0 +1,35 @@
+﻿import asyncio
+import logging
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until(hour: int) -> float:
+    """Segundos hasta la próxima vez que el reloj local marque esa hora"""
+    now = datetime.now()
+    target = datetime.combine(now.date(), time(hour=hour))
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_daily(hour: int, job: Callable[[], Awaitable[None]], name: str) -> None:
+    """Tarea de fondo del lifespan: ejecutar job cada día a la hora indicada (hora local)"""
+    while True:
+        await asyncio.sleep(seconds_until(hour))
+        try:
+            await job()
+        except Exception:
+            logger.exception("Error en la tarea diaria: %s", name)
+
+
+async def run_every(seconds: float, job: Callable[[], Awaitable[None]], name: str) -> None:
+    """Tarea de fondo del lifespan: ejecutar job cada `seconds` segundos"""
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            await job()
+        except Exception:
+            logger.exception("Error en la tarea periódica: %s", name)
@@ -1,22 +1,26 @@
 ﻿from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from jose import JWTError, jwt
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Query, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.core.cache import TTLCache
 from src.core.config import get_settings
-import hashlib
+from src.core.database import AsyncSessionLocal
+from src.models.database_models import User
+import time
 
 settings = get_settings()
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar contraseña con SHA256"""
-    hash_attempt = hashlib.sha256(plain_password.encode()).hexdigest()
-    return hash_attempt == hashed_password
-
-def get_password_hash(password: str) -> str:
-    """Hashear contraseña con SHA256 (sin límite de tamaño)"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# token -> (generación del usuario, claims, principal)
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
+_user_generations: Dict[int, int] = {}
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crear JWT token"""
@@ -26,7 +30,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # python-jose exige que "sub" sea una cadena
+    to_encode.update({"exp": expire, "sub": str(to_encode["sub"])})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -42,16 +47,95 @@ def decode_access_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def invalidate_user(user_id: int) -> None:
+    """Invalidar todos los tokens cacheados de un usuario (desactivación, cambios de perfil)"""
+    _user_generations[user_id] = _user_generations.get(user_id, 0) + 1
+
+async def _load_principal(user_id: int) -> Optional[dict]:
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        return None
+    return {
+        "id": user.id,
+        "email": user.email,
+        "family_size": user.family_size,
+        "is_active": user.is_active,
+        "created_at": user.created_at,
+    }
+
+async def authenticate_token(token: str) -> dict:
+    """Resolver el principal de un token (cacheado: sin verificar firma ni consultar BD en cada request)"""
+    cached = principal_cache.get(token)
+    
+    if cached is not None and cached[0] == _user_generations.get(cached[2]["id"], 0):
+        principal = cached[2]
+    else:
+        payload = decode_access_token(token)
+        
+        sub = payload.get("sub")
+        if sub is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="No se pudo validar las credenciales",
+            )
+        
+        user_id = int(sub)
+        generation = _user_generations.get(user_id, 0)
+        principal = await _load_principal(user_id)
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="No se pudo validar las credenciales",
+            )
+        
+        # La entrada nunca sobrevive a la expiración del propio token
+        ttl = min(settings.AUTH_CACHE_TTL_SECONDS, payload["exp"] - time.time())
+        principal_cache.set(token, (generation, payload, principal), ttl=ttl)
+    
+    if not principal["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario inactivo"
+        )
+    
+    return principal
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Obtener usuario actual desde token"""
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
+    return await authenticate_token(credentials.credentials)
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None, description="Token para clientes que no pueden enviar cabeceras (EventSource)")
+):
+    """Usuario actual para streams: cabecera Authorization o ?access_token="""
+    token = credentials.credentials if credentials else access_token
+    if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="No se pudo validar las credenciales",
+            detail="No autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    return {"id": user_id, "email": payload.get("email")}
+    return await authenticate_token(token)
+
+# ============================================================================
+# INVALIDACIÓN AL CONFIRMAR CAMBIOS EN USERS
+# ============================================================================
+
+_PENDING_KEY = "auth_invalidate_users"
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    for obj in session.dirty | session.deleted:
+        if isinstance(obj, User):
+            session.info.setdefault(_PENDING_KEY, set()).add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,55 @@
+﻿import asyncio
+import hashlib
+import hmac
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+# scrypt: KDF con coste de memoria ajustable y sin el límite de 72 bytes de bcrypt.
+# hashlib.scrypt libera el GIL, así que un pool de hilos basta para no bloquear el event loop.
+pwd_context = CryptContext(
+    schemes=["scrypt"],
+    scrypt__rounds=settings.PASSWORD_SCRYPT_ROUNDS,
+)
+
+_LEGACY_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+# Limita el trabajo encolado: una avalancha de logins espera aquí en vez de acumularse en el pool
+_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+async def _run_in_pool(func, *args):
+    async with _slots:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+def _verify_sync(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    if _LEGACY_SHA256.fullmatch(hashed):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        if not hmac.compare_digest(legacy, hashed):
+            return False, None
+        return True, pwd_context.hash(password)
+    return pwd_context.verify_and_update(password, hashed)
+
+async def hash_password(password: str) -> str:
+    """Hashear contraseña con scrypt fuera del event loop"""
+    return await _run_in_pool(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verificar contraseña; devuelve (válida, nuevo hash si hay que actualizar el almacenado)
+
+    Los hashes SHA-256 heredados y los scrypt con coste antiguo se regeneran
+    en el primer login correcto.
+    """
+    return await _run_in_pool(_verify_sync, password, hashed)
+
+# Hash de relleno para igualar el tiempo de respuesta cuando el email no existe
+DUMMY_HASH = pwd_context.hash("smartpantry-dummy-password")
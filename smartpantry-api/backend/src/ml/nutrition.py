@@ -0,0 +1,133 @@
+﻿from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Misma puntuación que smartpantry-api/src/scanner/score.ts::computeScore, por lotes:
+# cada producto es una fila y cada regla una operación sobre columnas completas.
+
+NUTRIMENT_COLUMNS = (
+    "energy-kcal_100g", "sugars_100g", "saturated-fat_100g",
+    "salt_100g", "fiber_100g", "proteins_100g",
+)
+ENERGY, SUGARS, SATURATED_FAT, SALT, FIBER, PROTEINS = range(len(NUTRIMENT_COLUMNS))
+
+GRADES = "abcde"
+# Puntos base por Nutri-Score; la última posición es "sin grado"
+GRADE_POINTS = np.array([90, 75, 60, 40, 20, 60], dtype=np.float64)
+NO_GRADE = len(GRADES)
+GRADE_INDEX = {grade: index for index, grade in enumerate(GRADES)}
+
+# (columna, umbral, factor, mínimo, máximo): base += clip((valor - umbral) * factor, mínimo, máximo)
+ADJUSTMENTS = (
+    (SUGARS, 5.0, -2.0, -30.0, 0.0),
+    (SATURATED_FAT, 2.0, -4.0, -30.0, 0.0),
+    (SALT, 0.3, -25.0, -25.0, 0.0),
+    (FIBER, 3.0, 4.0, -10.0, 20.0),
+    (PROTEINS, 5.0, 2.0, -10.0, 20.0),
+)
+
+# Avisos como bits de una máscara por producto: (columna, umbral, mensaje)
+WARNING_RULES = (
+    (SUGARS, 10.0, "Alto en azúcares (>10g/100g)"),
+    (SATURATED_FAT, 5.0, "Alto en grasas saturadas (>5g/100g)"),
+    (SALT, 1.2, "Alto en sal (>1.2g/100g)"),
+    (ENERGY, 400.0, "Muy calórico (>400kcal/100g)"),
+)
+ULTRA_PROCESSED = "Ultraprocesado (NOVA 4)"
+WARNING_MESSAGES = tuple(message for _, _, message in WARNING_RULES) + (ULTRA_PROCESSED,)
+
+
+@dataclass
+class NutritionBatch:
+    """Productos en columnas: nutrientes por 100 g (NaN = desconocido), grado y grupo NOVA (0 = desconocido)"""
+
+    nutrients: np.ndarray  # float64 (n, 6) en el orden de NUTRIMENT_COLUMNS
+    grades: np.ndarray  # int8 (n,), índice en GRADES o NO_GRADE
+    nova: np.ndarray  # int8 (n,)
+
+    def __len__(self) -> int:
+        return len(self.grades)
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column_array(rows: List[list]) -> np.ndarray:
+    # NumPy convierte None en NaN; solo si hay texto no numérico se recorre valor a valor
+    try:
+        return np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([[_number(value) for value in row] for row in rows], dtype=np.float64)
+
+
+def build_batch(products: Iterable[dict]) -> NutritionBatch:
+    """Pasar productos de Open Food Facts (campos compactos) a columnas"""
+    products = list(products)
+    nutrients = _column_array(
+        [[(product.get("nutriments") or {}).get(key) for key in NUTRIMENT_COLUMNS] for product in products]
+    ).reshape(len(products), len(NUTRIMENT_COLUMNS))
+    # OFF usa "unknown" o "not-applicable" cuando no hay grado: puntúan como sin grado
+    grades = np.array(
+        [GRADE_INDEX.get(product.get("nutriscore_grade"), NO_GRADE) for product in products],
+        dtype=np.int8,
+    )
+    nova = np.nan_to_num(
+        _column_array([product.get("nova_group") for product in products]), nan=0.0
+    ).astype(np.int8)
+    return NutritionBatch(nutrients, grades, nova)
+
+
+def score_batch(batch: NutritionBatch):
+    """Puntuaciones 0-100 (int) y máscaras de avisos (un bit por WARNING_MESSAGES)"""
+    base = GRADE_POINTS[batch.grades]
+    for column, threshold, factor, low, high in ADJUSTMENTS:
+        values = batch.nutrients[:, column]
+        adjustment = np.clip((values - threshold) * factor, low, high)
+        # Nutriente desconocido: no suma ni resta
+        base += np.where(np.isnan(values), 0.0, adjustment)
+    # Math.round de JS redondea .5 hacia arriba (np.round lo haría al par)
+    scores = np.clip(np.floor(base + 0.5), 0, 100).astype(np.int16)
+
+    warnings = np.zeros(len(batch), dtype=np.uint8)
+    with np.errstate(invalid="ignore"):
+        for bit, (column, threshold, _) in enumerate(WARNING_RULES):
+            warnings |= (batch.nutrients[:, column] > threshold).astype(np.uint8) << bit
+    warnings |= (batch.nova >= 4).astype(np.uint8) << len(WARNING_RULES)
+    return scores, warnings
+
+
+def warning_messages(mask: int) -> List[str]:
+    return [message for bit, message in enumerate(WARNING_MESSAGES) if mask >> bit & 1]
+
+
+def summarize(batch: NutritionBatch, scores: np.ndarray, warnings: np.ndarray) -> Dict[str, object]:
+    """Resumen del hogar: media, reparto por Nutri-Score y recuento de cada aviso"""
+    if not len(batch):
+        return {
+            "average_score": None,
+            "nutriscore_distribution": {},
+            "warnings": {},
+            "ultra_processed_share": None,
+        }
+    grade_counts = np.bincount(batch.grades, minlength=NO_GRADE + 1)
+    bits = np.arange(len(WARNING_MESSAGES), dtype=np.uint8)
+    warning_counts = ((warnings[:, None] >> bits) & 1).sum(axis=0)
+    return {
+        "average_score": round(float(scores.mean()), 1),
+        "nutriscore_distribution": {
+            grade.upper(): int(count) for grade, count in zip(GRADES, grade_counts) if count
+        },
+        "warnings": {
+            message: int(count) for message, count in zip(WARNING_MESSAGES, warning_counts) if count
+        },
+        "ultra_processed_share": round(float(warning_counts[-1]) / len(batch), 3),
+    }
+
+
+def grade_label(grade: int) -> Optional[str]:
+    return GRADES[grade].upper() if grade != NO_GRADE else None
@@ -1,7 +1,10 @@
 ﻿from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy.ext.orderinglist import ordering_list
 from sqlalchemy.sql import func
 from src.core.database import Base
+from src.services.normalization import fold_text, normalize_ingredient
+from src.services.units import parse_quantity
 
 class User(Base):
     __tablename__ = "users"
@@ -15,6 +18,9 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+    # Se incrementa en cada escritura de items (ETag / Last-Modified del inventario)
+    inventory_version = Column(Integer, nullable=False, default=0, server_default="0")
+    inventory_updated_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     items = relationship("PantryItem", back_populates="user", cascade="all, delete-orphan")
@@ -29,15 +35,24 @@ class PantryItem(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(100), index=True, nullable=False)
+    # Nombre sin tildes ni mayúsculas (services.search.search_key), indexado por pantry_items_fts
+    search_name = Column(String(100), nullable=False, default="", server_default="")
+    # Clave canónica del ingrediente (services.normalization.normalize_ingredient): "Tomates cherry" -> "tomate"
+    canonical_name = Column(String(100), nullable=False, default="", server_default="")
     category = Column(String(50), index=True, nullable=False)
     quantity = Column(Float, nullable=False)
     unit = Column(String(20), nullable=False)
+    # Cantidad en unidad base (services.units.to_base): 1.5 kg -> 1500 g; unidades sin equivalencia se conservan
+    base_quantity = Column(Float, nullable=False, default=0, server_default="0")
+    base_unit = Column(String(20), nullable=False, default="", server_default="")
     expiration_date = Column(Date, nullable=True, index=True)
     barcode = Column(String(50), nullable=True)
     location = Column(String(50), nullable=True)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Versión del inventario del usuario en la última escritura (cursor de /items/changes)
+    sync_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="items")
@@ -46,26 +61,164 @@ class PantryItem(Base):
         Index('idx_item_user', 'user_id'),
         Index('idx_item_category', 'category'),
         Index('idx_item_expiration', 'expiration_date'),
+        Index('idx_item_user_expiration', 'user_id', 'expiration_date', 'id'),
+        Index('idx_item_user_search', 'user_id', 'search_name'),
+        Index('idx_item_user_canonical', 'user_id', 'canonical_name', 'base_unit', 'base_quantity'),
+        Index('idx_item_user_sync', 'user_id', 'sync_version', 'id'),
+        Index('idx_item_user_category', 'user_id', 'category'),
     )
 
+# Bajas de items: /items/changes las propaga a los clientes que sincronizan
+class ItemTombstone(Base):
+    __tablename__ = "item_tombstones"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    item_id = Column(Integer, nullable=False)
+    sync_version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_tombstone_user_sync', 'user_id', 'sync_version', 'item_id'),
+    )
+
+# Items caducados o que caducan dentro de la ventana, recalculada a diario y en cada escritura
+class ItemExpiration(Base):
+    __tablename__ = "item_expirations"
+    
+    item_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    expiration_date = Column(Date, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_expiration_user_date', 'user_id', 'expiration_date', 'item_id'),
+    )
+
+class ExpirationScan(Base):
+    __tablename__ = "expiration_scans"
+    
+    id = Column(Integer, primary_key=True)
+    as_of = Column(Date, nullable=True)
+
+# Consumo de items (bajadas de cantidad y bajas); solo se añaden filas
+class ConsumptionEvent(Base):
+    __tablename__ = "consumption_events"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    item_id = Column(Integer, nullable=False)
+    kind = Column(String(10), nullable=False)  # "consumed" o "deleted"
+    category = Column(String(50), nullable=False)
+    canonical_name = Column(String(100), nullable=False)
+    # Cantidad consumida en unidad base (ver PantryItem.base_quantity)
+    base_quantity = Column(Float, nullable=False)
+    base_unit = Column(String(20), nullable=False)
+    day = Column(Date, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_consumption_user_event', 'user_id', 'id'),
+    )
+
+# Eventos de consumo agregados por usuario, día y categoría (services.consumption.rollup_consumption)
+class ConsumptionDaily(Base):
+    __tablename__ = "consumption_daily"
+    
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+    items_consumed = Column(Integer, nullable=False, default=0)
+
+class ConsumptionRollupState(Base):
+    __tablename__ = "consumption_rollup_state"
+    
+    id = Column(Integer, primary_key=True)
+    # Último evento ya sumado en consumption_daily
+    last_event_id = Column(Integer, nullable=False, default=0)
+
 class Recipe(Base):
     __tablename__ = "recipes"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), index=True, nullable=False)
     description = Column(Text, nullable=True)
-    ingredients = Column(Text, nullable=False)  # JSON string
-    instructions = Column(Text, nullable=False)  # JSON string
+    instructions = Column(Text, nullable=False)  # JSON string (solo se lee completo)
     prep_time = Column(Integer, nullable=False)
     cook_time = Column(Integer, nullable=True)
     servings = Column(Integer, default=4)
     difficulty = Column(String(20), nullable=False)
     cuisine = Column(String(50), nullable=True)
-    tags = Column(Text, nullable=True)  # JSON string
     image_url = Column(String(500), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Un bit por dieta incompatible (services.diet.DIETS); se recalcula al escribir ingredientes
+    diet_flags = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Relationships
+    ingredients = relationship(
+        "RecipeIngredient",
+        back_populates="recipe",
+        order_by="RecipeIngredient.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    tags = relationship(
+        "RecipeTag",
+        back_populates="recipe",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
     
     __table_args__ = (
         Index('idx_recipe_difficulty', 'difficulty'),
         Index('idx_recipe_cuisine', 'cuisine'),
+        Index('idx_recipe_diet', 'diet_flags', 'id'),
+    )
+
+class RecipeIngredient(Base):
+    __tablename__ = "recipe_ingredients"
+    
+    id = Column(Integer, primary_key=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    name = Column(String(200), nullable=False)
+    # Misma clave canónica que PantryItem.canonical_name
+    normalized_name = Column(String(200), nullable=False)
+    # Cantidad de la línea en unidad base ("200 g de arroz"); NULL si no indica cantidad
+    base_quantity = Column(Float, nullable=True)
+    base_unit = Column(String(20), nullable=True)
+    
+    # Relationships
+    recipe = relationship("Recipe", back_populates="ingredients")
+    
+    __table_args__ = (
+        Index('idx_recipe_ingredient_name', 'normalized_name', 'recipe_id'),
+        Index('idx_recipe_ingredient_recipe', 'recipe_id', 'position'),
     )
+    
+    @validates('name')
+    def _set_normalized_name(self, key, value):
+        self.normalized_name = normalize_ingredient(value)
+        self.base_quantity, self.base_unit = parse_quantity(value) or (None, None)
+        return value
+
+class RecipeTag(Base):
+    __tablename__ = "recipe_tags"
+    
+    id = Column(Integer, primary_key=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(50), nullable=False)
+    normalized_name = Column(String(50), nullable=False)
+    
+    # Relationships
+    recipe = relationship("Recipe", back_populates="tags")
+    
+    __table_args__ = (
+        Index('idx_recipe_tag_name', 'normalized_name', 'recipe_id'),
+        Index('idx_recipe_tag_recipe', 'recipe_id'),
+    )
+    
+    @validates('name')
+    def _set_normalized_name(self, key, value):
+        self.normalized_name = fold_text(value)
+        return value
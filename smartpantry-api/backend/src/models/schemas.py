@@ -17,6 +17,13 @@ class CategoryEnum(str, Enum):
     BAKERY = "bakery"
     OTHER = "other"
 
+class DietEnum(str, Enum):
+    VEGETARIAN = "vegetarian"
+    VEGAN = "vegan"
+    GLUTEN_FREE = "gluten_free"
+    LACTOSE_FREE = "lactose_free"
+    NUT_FREE = "nut_free"
+
 # ============================================================================
 # USER SCHEMAS
 # ============================================================================
@@ -94,6 +101,59 @@ class ItemResponse(ItemBase):
     class Config:
         from_attributes = True
 
+class ItemBulkUpdate(ItemUpdate):
+    id: int
+
+class ItemBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # "created", "updated", "deleted", "not_found", "invalid"
+    detail: Optional[str] = None
+    item: Optional[ItemResponse] = None
+
+class BulkOperationResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ItemChanges(BaseModel):
+    items: List[ItemResponse]  # creados o modificados desde el cursor
+    deleted: List[int]  # ids eliminados (aplicar antes que items)
+    cursor: str  # enviar como ?since= en la siguiente sincronización
+    has_more: bool
+
+# ============================================================================
+# PRODUCT SCHEMAS (códigos de barras)
+# ============================================================================
+
+class ProductInfo(BaseModel):
+    barcode: str
+    name: Optional[str] = None
+    brand: Optional[str] = None
+    categories: List[str] = Field(default_factory=list)
+    quantity: Optional[str] = None
+    nutriscore_grade: Optional[str] = None
+    nova_group: Optional[int] = None
+    ingredients_text: Optional[str] = None
+    additives: List[str] = Field(default_factory=list)
+    image_url: Optional[str] = None
+    nutriments: dict = Field(default_factory=dict)  # valores por 100 g
+
+class BarcodeBatchRequest(BaseModel):
+    barcodes: List[str] = Field(..., min_length=1, max_length=100)
+
+class BarcodeLookupResult(BaseModel):
+    barcode: str
+    status: str  # "found", "not_found", "invalid", "error"
+    product: Optional[ProductInfo] = None
+
+class BarcodeBatchResponse(BaseModel):
+    found: int
+    results: List[BarcodeLookupResult]
+
 # ============================================================================
 # RECIPE SCHEMAS
 # ============================================================================
@@ -114,11 +174,35 @@ class RecipeResponse(RecipeBase):
     id: int
     match_percentage: Optional[float] = Field(None, ge=0, le=100)
     missing_ingredients: List[str] = Field(default_factory=list)
+    diets: List[DietEnum] = Field(default_factory=list)  # dietas compatibles
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class AISuggestions(BaseModel):
+    recipes: List[RecipeBase]
+    cached: bool  # respuesta compartida con otra despensa equivalente
+
+# ============================================================================
+# SHOPPING SCHEMAS
+# ============================================================================
+
+class ShoppingPlanRequest(BaseModel):
+    recipe_ids: List[int] = Field(..., min_length=1, max_length=50)
+    servings_multiplier: float = Field(1.0, gt=0, le=20)
+
+class ShoppingPlanItem(BaseModel):
+    name: str  # clave canónica del ingrediente
+    quantity: Optional[float] = None  # lo que falta; None si las recetas no indican cantidad
+    unit: Optional[str] = None  # unidad base: "g", "ml", "unidad"...
+    in_pantry: float = 0  # lo que ya hay, en la misma unidad
+    recipe_ids: List[int]
+
+class ShoppingPlan(BaseModel):
+    items: List[ShoppingPlanItem]
+    missing_recipe_ids: List[int] = Field(default_factory=list)
+
 # ============================================================================
 # ANALYTICS SCHEMAS
 # ============================================================================
@@ -130,6 +214,24 @@ class InventoryStats(BaseModel):
     expired_items: int
     total_value_estimate: Optional[float] = None
 
+class ItemNutrition(BaseModel):
+    item_id: int
+    name: str
+    barcode: str
+    score: int = Field(..., ge=0, le=100)
+    nutriscore_grade: Optional[str] = None  # "A".."E"
+    nova_group: Optional[int] = None
+    warnings: List[str] = Field(default_factory=list)
+
+class PantryNutrition(BaseModel):
+    scored_items: int
+    unscored_items: int  # sin código de barras o producto desconocido
+    average_score: Optional[float] = None
+    nutriscore_distribution: dict
+    warnings: dict  # aviso -> número de items
+    ultra_processed_share: Optional[float] = None
+    items: List[ItemNutrition]
+
 class ConsumptionTrend(BaseModel):
     category: str
     items_consumed: int
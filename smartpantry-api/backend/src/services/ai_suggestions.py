@@ -0,0 +1,272 @@
+﻿import asyncio
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.models.schemas import RecipeBase
+from src.services.llm import LLMClient, LLMError, llm_client
+from src.services.normalization import normalize_ingredient
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SYSTEM_STYLE = (
+    "Eres un chef español cercano y con chispa. No uses ni menciones marcas ni nombres de personas reales.\n"
+    "Estilo: breve, práctico, humor blanco, refranes suaves, tips de aprovechamiento y seguridad alimentaria.\n"
+    "Devuelve SOLO JSON válido conforme al esquema pedido, sin texto extra."
+)
+
+RECIPE_SCHEMA = """Devuelve un JSON con este esquema:
+{
+  "recipes": [
+    {
+      "name": "string",
+      "description": "string",
+      "ingredients": ["string"],
+      "instructions": ["string"],
+      "prep_time": 0,
+      "cook_time": 0,
+      "servings": 0,
+      "difficulty": "easy | medium | hard",
+      "cuisine": "string",
+      "tags": ["string"]
+    }
+  ]
+}"""
+
+STREAM_ERROR = {"type": "error", "detail": "No se pudieron generar sugerencias"}
+
+# Despensas enormes no mejoran la respuesta y encarecen cada llamada
+MAX_PROMPT_INGREDIENTS = 60
+
+
+@dataclass(frozen=True)
+class SuggestionRequest:
+    """Entrada canónica: dos hogares con la misma despensa normalizada comparten prompt y caché"""
+
+    ingredients: Tuple[str, ...]  # normalizados, sin duplicados y ordenados
+    diets: Tuple[str, ...]
+    servings: int
+
+    @property
+    def fingerprint(self) -> str:
+        payload = json.dumps([self.ingredients, self.diets, self.servings], separators=(",", ":"))
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def build_request(pantry_names: Iterable[str], diets: Iterable[str], servings: int) -> SuggestionRequest:
+    keys = sorted({normalize_ingredient(name) for name in pantry_names} - {""})
+    return SuggestionRequest(
+        ingredients=tuple(keys[:MAX_PROMPT_INGREDIENTS]),
+        diets=tuple(sorted(set(diets))),
+        servings=servings,
+    )
+
+
+def build_prompt(request: SuggestionRequest) -> str:
+    context = {
+        "pantry": list(request.ingredients),
+        "servings": request.servings,
+        "dietary": list(request.diets),
+        "recipes_wanted": settings.AI_SUGGESTIONS_COUNT,
+    }
+    return (
+        f"Contexto:\n{json.dumps(context, ensure_ascii=False, indent=2)}\n\n{RECIPE_SCHEMA}\n"
+        "Usa sobre todo ingredientes de la despensa y respeta todas las dietas indicadas. "
+        "Respeta cantidades y tiempos realistas (minutos)."
+    )
+
+
+def _validate_recipe(item) -> Optional[RecipeBase]:
+    try:
+        return RecipeBase.model_validate(item)
+    except ValidationError as exc:
+        logger.info("Receta del LLM descartada: %d errores de validación", exc.error_count())
+        return None
+
+
+def parse_recipes(raw: str) -> List[RecipeBase]:
+    """Recetas válidas de la salida del LLM; las que no cumplen RecipeBase se descartan"""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        # Algunos modelos envuelven el JSON en texto
+        match = re.search(r"\{[\s\S]*\}", raw)
+        if not match:
+            raise LLMError("El LLM devolvió salida no JSON")
+        try:
+            data = json.loads(match.group(0))
+        except ValueError as exc:
+            raise LLMError("El LLM devolvió salida no JSON") from exc
+
+    items = data.get("recipes") if isinstance(data, dict) else None
+    recipes = []
+    for item in items if isinstance(items, list) else []:
+        recipe = _validate_recipe(item)
+        if recipe is not None:
+            recipes.append(recipe)
+    if not recipes:
+        raise LLMError("El LLM no devolvió ninguna receta válida")
+    return recipes
+
+
+class RecipeStreamParser:
+    """Extraer las recetas completas del JSON a medida que llega el texto
+
+    Sigue la anidación (ignorando llaves dentro de cadenas) y devuelve cada
+    objeto que se cierra como elemento del array de nivel superior
+    ({"recipes": [{...}, {...}]}) sin esperar al final del documento.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[RecipeBase]:
+        self._text += chunk
+        recipes = []
+        text, stack = self._text, self._stack
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and stack == ["{", "["]:
+                    self._start = pos
+                stack.append(char)
+            elif char in "}]" and stack:
+                stack.pop()
+                if char == "}" and self._start is not None and stack == ["{", "["]:
+                    recipe = self._parse(text[self._start:pos + 1])
+                    if recipe is not None:
+                        recipes.append(recipe)
+                    self._start = None
+        self._pos = len(text)
+        if self._start is None:
+            # Lo ya recorrido fuera de una receta no se vuelve a necesitar
+            self._text, self._pos = "", 0
+        return recipes
+
+    @staticmethod
+    def _parse(raw: str) -> Optional[RecipeBase]:
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return None
+        return _validate_recipe(item)
+
+
+class SuggestionService:
+    """Sugerencias con LLM: caché por huella de despensa (TTL + LRU) y coalescencia
+
+    Peticiones idénticas en vuelo comparten una sola llamada al LLM; los
+    errores no se cachean.
+    """
+
+    def __init__(self, client: LLMClient, max_entries: int, ttl: float):
+        self.client = client
+        self.cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _generate(self, request: SuggestionRequest) -> List[RecipeBase]:
+        raw = await self.client.complete(SYSTEM_STYLE, build_prompt(request))
+        recipes = parse_recipes(raw)
+        self.cache.set(request.fingerprint, recipes)
+        return recipes
+
+    async def suggest(self, request: SuggestionRequest) -> Tuple[List[RecipeBase], bool]:
+        """(recetas, si venían de la caché)"""
+        key = request.fingerprint
+        recipes = self.cache.get(key)
+        if recipes is not None:
+            return recipes, True
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generate(request))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: si un cliente se desconecta no se cancela la llamada que esperan los demás
+        return await asyncio.shield(pending), False
+
+    async def stream(self, request: SuggestionRequest) -> AsyncIterator[dict]:
+        """Eventos token / recipe / done (o error) según genera el LLM
+
+        Con la respuesta en caché, o ya en vuelo para la misma huella, se emiten
+        directamente las recetas; si no, se reenvían los fragmentos del LLM y
+        cada receta en cuanto se cierra y valida contra RecipeBase.
+        """
+        key = request.fingerprint
+        recipes = self.cache.get(key)
+        pending = self._inflight.get(key)
+        if recipes is not None or pending is not None:
+            cached = recipes is not None
+            if not cached:
+                try:
+                    recipes = await asyncio.shield(pending)
+                except LLMError:
+                    yield STREAM_ERROR
+                    return
+            for index, recipe in enumerate(recipes):
+                yield {"type": "recipe", "index": index, "recipe": recipe.model_dump()}
+            yield {"type": "done", "count": len(recipes), "cached": cached}
+            return
+
+        # Las peticiones idénticas que lleguen mientras tanto esperan a este stream
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        parser = RecipeStreamParser()
+        recipes, chunks = [], []
+        try:
+            async for chunk in self.client.stream(SYSTEM_STYLE, build_prompt(request)):
+                chunks.append(chunk)
+                yield {"type": "token", "text": chunk}
+                for recipe in parser.feed(chunk):
+                    yield {"type": "recipe", "index": len(recipes), "recipe": recipe.model_dump()}
+                    recipes.append(recipe)
+            if not recipes:
+                # El modelo no siguió el esquema al pie de la letra: último intento con el texto completo
+                recipes = parse_recipes("".join(chunks))
+                for index, recipe in enumerate(recipes):
+                    yield {"type": "recipe", "index": index, "recipe": recipe.model_dump()}
+            self.cache.set(key, recipes)
+            future.set_result(recipes)
+        except LLMError as exc:
+            logger.warning("Sugerencias en stream fallidas: %s", exc)
+            future.set_exception(exc)
+            yield STREAM_ERROR
+            return
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                # Cliente desconectado a mitad: quien esperaba recibe un error, no se queda colgado
+                future.set_exception(LLMError("Generación interrumpida"))
+            # Consultarla marca la excepción como recuperada aunque nadie esperase
+            future.exception()
+
+        yield {"type": "done", "count": len(recipes), "cached": False}
+
+
+suggestion_service = SuggestionService(
+    llm_client,
+    max_entries=settings.AI_SUGGESTIONS_CACHE_MAX_ENTRIES,
+    ttl=settings.AI_SUGGESTIONS_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,220 @@
+﻿import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from src.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BARCODE_PATTERN = re.compile(r"\d{8,14}")
+
+# Solo se piden a Open Food Facts los campos que usa la app (offClient.ts::OFFProduct)
+OFF_FIELDS = (
+    "code,product_name,brands,categories,nutriments,nutriscore_grade,nova_group,"
+    "ingredients_text_es,additives_tags,image_small_url,quantity,lang"
+)
+NUTRIMENT_KEYS = (
+    "energy-kcal_100g", "sugars_100g", "saturated-fat_100g",
+    "salt_100g", "fiber_100g", "proteins_100g",
+)
+
+
+class BarcodeLookupError(Exception):
+    """Open Food Facts no respondió o devolvió un error (no se cachea)"""
+
+
+def is_valid_barcode(barcode: str) -> bool:
+    return BARCODE_PATTERN.fullmatch(barcode) is not None
+
+
+def _compact_product(product: dict) -> dict:
+    # Lo que se guarda en caché: los campos de OFF_FIELDS y solo los nutrientes usados
+    nutriments = product.get("nutriments") or {}
+    compact = {key: value for key, value in product.items() if key != "nutriments" and value not in (None, "", [])}
+    compact["nutriments"] = {key: nutriments[key] for key in NUTRIMENT_KEYS if key in nutriments}
+    return compact
+
+
+class ProductCache:
+    """Caché persistente de productos en un fichero SQLite local, con TTL y desalojo LRU
+
+    El fichero se comparte entre workers: desde la API se usa con read()/write(),
+    que ejecutan las consultas en un hilo propio para que esperar el lock de
+    escritura (timeout de 1 s) no pare el event loop.
+    """
+
+    _EVICT_EVERY = 100
+    # last_access solo se reescribe si ha pasado este tiempo: un acierto no siempre es una escritura
+    _TOUCH_AFTER_SECONDS = 3600
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        # Un solo hilo: la conexión se usa siempre desde él y las consultas se encolan
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-cache")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión perezosa: cada worker abre la suya después de arrancar
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=1)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                "barcode TEXT PRIMARY KEY, payload TEXT, expires_at REAL NOT NULL, last_access REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_last_access ON products (last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, barcode: str):
+        """(hay entrada vigente, producto o None si OFF no lo conoce)"""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT payload, last_access FROM products WHERE barcode = ? AND expires_at > ?",
+            (barcode, now),
+        ).fetchone()
+        if row is None:
+            return False, None
+        payload, last_access = row
+        if now - last_access > self._TOUCH_AFTER_SECONDS:
+            conn.execute("UPDATE products SET last_access = ? WHERE barcode = ?", (now, barcode))
+        return True, (json.loads(payload) if payload is not None else None)
+
+    def set(self, barcode: str, product: Optional[dict], ttl: float) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO products (barcode, payload, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (barcode, json.dumps(product, ensure_ascii=False) if product is not None else None, now + ttl, now),
+        )
+        self._writes += 1
+        if self._writes % self._EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Borrar caducados y, si sobra, los menos usados recientemente"""
+        conn = self._connect()
+        conn.execute("DELETE FROM products WHERE expires_at <= ?", (time.time(),))
+        (count,) = conn.execute("SELECT count(*) FROM products").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM products WHERE barcode IN "
+                "(SELECT barcode FROM products ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM products")
+
+    async def read(self, barcode: str):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.get, barcode)
+
+    async def write(self, barcode: str, product: Optional[dict], ttl: float) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.set, barcode, product, ttl)
+
+
+class BarcodeService:
+    """Resolución de códigos de barras contra Open Food Facts
+
+    Caché persistente delante, un pool de conexiones httpx compartido y
+    coalescencia: lecturas concurrentes del mismo código comparten una sola petición.
+    """
+
+    def __init__(self, base_url: str, cache: ProductCache):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=settings.OFF_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.OFF_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OFF_MAX_CONNECTIONS,
+                ),
+                headers={"Accept": "application/json", "User-Agent": settings.OFF_USER_AGENT},
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch(self, barcode: str) -> Optional[dict]:
+        try:
+            response = await self._http().get(
+                f"/api/v2/product/{barcode}.json",
+                params={"fields": OFF_FIELDS},
+            )
+        except httpx.HTTPError as exc:
+            raise BarcodeLookupError(f"Open Food Facts no disponible: {exc}") from exc
+
+        # OFF responde 404 con status=0 para productos desconocidos
+        if response.status_code == 404:
+            product = None
+        elif response.is_success:
+            try:
+                body = response.json()
+                product = _compact_product(body["product"]) if body.get("status") == 1 and body.get("product") else None
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                # Página de error o mantenimiento con 200: fallo del código, no se guarda en caché
+                raise BarcodeLookupError(f"Respuesta no válida de Open Food Facts: {exc}") from exc
+        else:
+            raise BarcodeLookupError(f"Open Food Facts respondió {response.status_code}")
+
+        ttl = settings.PRODUCT_CACHE_TTL_SECONDS if product else settings.PRODUCT_CACHE_NOT_FOUND_TTL_SECONDS
+        try:
+            await self.cache.write(barcode, product, ttl)
+        except sqlite3.Error as exc:
+            logger.warning("No se pudo guardar %s en la caché de productos: %s", barcode, exc)
+        return product
+
+    async def lookup(self, barcode: str) -> Optional[dict]:
+        """Producto (campos compactos de OFF) o None si no existe"""
+        try:
+            cached, product = await self.cache.read(barcode)
+        except sqlite3.Error as exc:
+            # Una caché rota no impide resolver el código
+            logger.warning("Caché de productos no disponible: %s", exc)
+            cached, product = False, None
+        if cached:
+            return product
+
+        pending = self._inflight.get(barcode)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(barcode))
+            self._inflight[barcode] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(barcode, None))
+        # shield: si un cliente se desconecta no se cancela la petición que esperan los demás
+        return await asyncio.shield(pending)
+
+    async def lookup_many(self, barcodes: Iterable[str]) -> Dict[str, object]:
+        """Resolver varios códigos en paralelo; el valor es el producto, None o la excepción"""
+        unique = list(dict.fromkeys(barcodes))
+        results = await asyncio.gather(*(self.lookup(code) for code in unique), return_exceptions=True)
+        return dict(zip(unique, results))
+
+
+barcode_service = BarcodeService(
+    settings.OFF_BASE_URL,
+    ProductCache(settings.PRODUCT_CACHE_PATH, settings.PRODUCT_CACHE_MAX_ENTRIES),
+)
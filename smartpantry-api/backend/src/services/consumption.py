@@ -0,0 +1,203 @@
+﻿import logging
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, insert, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.core.database import AsyncSessionLocal
+from src.models.database_models import ConsumptionDaily, ConsumptionEvent, ConsumptionRollupState
+from src.models.schemas import ConsumptionTrend
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Cambio relativo del ritmo de consumo (segunda mitad del periodo frente a la primera)
+# a partir del cual la tendencia deja de ser "stable"
+TREND_THRESHOLD = 0.2
+
+
+def consumed_event(user_id: int, item_id: int, current, values: dict) -> Optional[dict]:
+    """Evento de consumo de un UPDATE que baja la cantidad de un item, si lo hace
+
+    current: fila guardada (category, canonical_name, base_quantity, base_unit);
+    values: valores del UPDATE ya con sus columnas derivadas.
+    """
+    if "base_quantity" not in values or values.get("base_unit", current.base_unit) != current.base_unit:
+        return None  # sin cambio de cantidad, o de una unidad a otra sin equivalencia
+    consumed = current.base_quantity - values["base_quantity"]
+    if consumed <= 0:
+        return None
+    return {
+        "user_id": user_id,
+        "item_id": item_id,
+        "kind": "consumed",
+        "category": values.get("category", current.category),
+        "canonical_name": values.get("canonical_name", current.canonical_name),
+        "base_quantity": consumed,
+        "base_unit": current.base_unit,
+        "day": date.today(),
+    }
+
+
+def deleted_event(user_id: int, row) -> dict:
+    """Evento de la baja de un item: se consume todo lo que quedaba
+
+    row: (id, category, canonical_name, base_quantity, base_unit) del item borrado.
+    """
+    return {
+        "user_id": user_id,
+        "item_id": row.id,
+        "kind": "deleted",
+        "category": row.category,
+        "canonical_name": row.canonical_name,
+        "base_quantity": row.base_quantity,
+        "base_unit": row.base_unit,
+        "day": date.today(),
+    }
+
+
+async def record_consumption(db: AsyncSession, events: List[Optional[dict]]) -> None:
+    """Añadir los eventos en la transacción de la escritura que los produce"""
+    events = [event for event in events if event is not None]
+    if events:
+        await db.execute(insert(ConsumptionEvent), events)
+
+
+async def _rollup_batch(db: AsyncSession, batch_size: int) -> int:
+    last_event_id = await db.scalar(
+        select(ConsumptionRollupState.last_event_id).where(ConsumptionRollupState.id == 1)
+    )
+    rows = (await db.execute(
+        select(ConsumptionEvent.id, ConsumptionEvent.user_id, ConsumptionEvent.day, ConsumptionEvent.category)
+        .where(ConsumptionEvent.id > last_event_id)
+        .order_by(ConsumptionEvent.id)
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        return 0
+
+    # Reclamar el tramo: si otro worker ya movió la marca, no se suma dos veces
+    claimed = await db.execute(
+        update(ConsumptionRollupState)
+        .where(
+            ConsumptionRollupState.id == 1,
+            ConsumptionRollupState.last_event_id == last_event_id
+        )
+        .values(last_event_id=rows[-1].id)
+        .execution_options(synchronize_session=False)
+    )
+    if not claimed.rowcount:
+        return 0
+
+    counts = Counter((row.user_id, row.day, row.category) for row in rows)
+    existing = set((await db.execute(
+        select(ConsumptionDaily.user_id, ConsumptionDaily.day, ConsumptionDaily.category)
+        .where(
+            ConsumptionDaily.user_id.in_({user_id for user_id, _, _ in counts}),
+            ConsumptionDaily.day.between(min(day for _, day, _ in counts), max(day for _, day, _ in counts))
+        )
+    )).all())
+    new_rows = [
+        {"user_id": user_id, "day": day, "category": category, "items_consumed": count}
+        for (user_id, day, category), count in counts.items()
+        if (user_id, day, category) not in existing
+    ]
+    if new_rows:
+        await db.execute(insert(ConsumptionDaily), new_rows)
+    for key in existing & counts.keys():
+        user_id, day, category = key
+        await db.execute(
+            update(ConsumptionDaily)
+            .where(
+                ConsumptionDaily.user_id == user_id,
+                ConsumptionDaily.day == day,
+                ConsumptionDaily.category == category
+            )
+            .values(items_consumed=ConsumptionDaily.items_consumed + counts[key])
+        )
+    return len(rows)
+
+
+async def rollup_consumption() -> None:
+    """Tarea periódica del lifespan: sumar a consumption_daily los eventos nuevos
+
+    Incremental: cada pasada lee solo los eventos posteriores a la marca y la
+    avanza en la misma transacción. Los ids se asignan en orden de commit
+    porque SQLite serializa las escrituras.
+    """
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                processed = await _rollup_batch(session, settings.CONSUMPTION_ROLLUP_BATCH_SIZE)
+        total += processed
+        if processed < settings.CONSUMPTION_ROLLUP_BATCH_SIZE:
+            break
+    if total:
+        logger.info("Agregados de consumo actualizados: %d eventos", total)
+
+
+def _trend(recent: float, previous: float) -> str:
+    if recent > previous * (1 + TREND_THRESHOLD):
+        return "increasing"
+    if recent < previous * (1 - TREND_THRESHOLD):
+        return "decreasing"
+    return "stable"
+
+
+async def consumption_trends(db: AsyncSession, user_id: int, days: int) -> List[ConsumptionTrend]:
+    """Consumo por categoría en los últimos `days` días y su tendencia
+
+    Se compara el ritmo diario de la segunda mitad del periodo con el de la
+    primera. Lee los agregados diarios y, para no depender de la última
+    pasada del job, los eventos que aún no se han agregado.
+    """
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    middle = start + timedelta(days=days // 2)
+
+    def halves(day_column, amount):
+        return (
+            func.sum(case((day_column < middle, amount), else_=0)),
+            func.sum(case((day_column >= middle, amount), else_=0)),
+        )
+
+    rolled = (
+        select(ConsumptionDaily.category, *halves(ConsumptionDaily.day, ConsumptionDaily.items_consumed))
+        .where(ConsumptionDaily.user_id == user_id, ConsumptionDaily.day >= start)
+        .group_by(ConsumptionDaily.category)
+    )
+    last_event_id = select(ConsumptionRollupState.last_event_id).where(ConsumptionRollupState.id == 1)
+    pending = (
+        select(ConsumptionEvent.category, *halves(ConsumptionEvent.day, 1))
+        .where(
+            ConsumptionEvent.user_id == user_id,
+            ConsumptionEvent.id > last_event_id.scalar_subquery(),
+            ConsumptionEvent.day >= start
+        )
+        .group_by(ConsumptionEvent.category)
+    )
+    # Una sola sentencia: agregados y pendientes ven la misma marca aunque el job
+    # haga commit entre medias (con dos lecturas, lo movido no lo contaría ninguna)
+    rows = (await db.execute(union_all(rolled, pending))).all()
+
+    totals: Dict[str, List[int]] = {}
+    for category, previous, recent in rows:
+        counts = totals.setdefault(category, [0, 0])
+        counts[0] += previous or 0
+        counts[1] += recent or 0
+
+    previous_days, recent_days = (middle - start).days, (today - middle).days + 1
+    trends = [
+        ConsumptionTrend(
+            category=category,
+            items_consumed=previous + recent,
+            trend=_trend(recent / recent_days, previous / previous_days),
+        )
+        for category, (previous, recent) in totals.items()
+    ]
+    trends.sort(key=lambda trend: (-trend.items_consumed, trend.category))
+    return trends
@@ -0,0 +1,94 @@
+﻿import logging
+import re
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.models.database_models import Recipe, RecipeIngredient
+from src.services.normalization import normalize_ingredient
+
+logger = logging.getLogger(__name__)
+
+# Grupos de ingredientes (sobre el nombre normalizado, ver match.ts::violatesDiet)
+MEAT_FISH = r"\b(pollo|pavo|carne|ternera|cerdo|cordero|jamon|chorizo|bacon|panceta|atun|salmon|merluza|bacalao|gambas?|pescado|anchoas?)"
+ANIMAL_PRODUCTS = r"\b(huevos?|queso|leche|nata|mantequilla|yogur|miel)"
+GLUTEN = r"\b(trigo|pan(?:es)?|panko|harina|cuscus|pasta|cebada|centeno)\b"
+LACTOSE = r"\b(leche|nata|queso|mantequilla|yogur)"
+NUTS = r"\b(nuez|nueces|almendras?|avellanas?|cacahuetes?|pistachos?|anacardos?)"
+
+# Cada dieta ocupa un bit fijo de Recipe.diet_flags; para añadir una, usar el siguiente bit libre.
+# Un bit activado significa que la receta contiene algo incompatible con esa dieta.
+DIETS: Dict[str, tuple] = {
+    "vegetarian": (0, (MEAT_FISH,)),
+    "vegan": (1, (MEAT_FISH, ANIMAL_PRODUCTS)),
+    "gluten_free": (2, (GLUTEN,)),
+    "lactose_free": (3, (LACTOSE,)),
+    "nut_free": (4, (NUTS,)),
+}
+
+_PATTERNS = {
+    name: (1 << bit, re.compile("|".join(groups)))
+    for name, (bit, groups) in DIETS.items()
+}
+
+
+def diet_mask(diets: Iterable[str]) -> int:
+    """Bits de las dietas pedidas: una receta es apta si diet_flags & mask == 0"""
+    mask = 0
+    for name in diets:
+        mask |= _PATTERNS[name][0]
+    return mask
+
+
+def compute_diet_flags(ingredients: Iterable[str]) -> int:
+    flags = 0
+    keys = [normalize_ingredient(name) for name in ingredients]
+    for bit, pattern in _PATTERNS.values():
+        if any(pattern.search(key) for key in keys):
+            flags |= bit
+    return flags
+
+
+def compatible_diets(flags: int) -> List[str]:
+    return [name for name, (bit, _) in _PATTERNS.items() if not flags & bit]
+
+
+async def sync_diet_flags(db: AsyncSession) -> int:
+    """Recalcular diet_flags de las recetas cuyas reglas han cambiado (al arrancar)"""
+    stored = dict((await db.execute(select(Recipe.id, Recipe.diet_flags))).all())
+    result = await db.execute(
+        select(RecipeIngredient.recipe_id, RecipeIngredient.name)
+        .order_by(RecipeIngredient.recipe_id)
+    )
+    computed = {
+        recipe_id: compute_diet_flags(name for _, name in rows)
+        for recipe_id, rows in groupby(result.all(), key=itemgetter(0))
+    }
+    changes = [
+        {"id": recipe_id, "diet_flags": computed.get(recipe_id, 0)}
+        for recipe_id, flags in stored.items()
+        if computed.get(recipe_id, 0) != flags
+    ]
+    if changes:
+        await db.execute(update(Recipe), changes)
+        logger.info("diet_flags recalculado en %d recetas", len(changes))
+    return len(changes)
+
+
+@event.listens_for(Session, "before_flush")
+def _set_diet_flags(session, flush_context, instances):
+    """Recalcular diet_flags de cada receta cuyos ingredientes se escriben en este flush"""
+    recipes = {obj for obj in session.new | session.dirty if isinstance(obj, Recipe)}
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, RecipeIngredient) and obj.recipe is not None:
+            recipes.add(obj.recipe)
+    for recipe in recipes:
+        if recipe in session.deleted:
+            continue
+        recipe.diet_flags = compute_diet_flags(
+            ingredient.name for ingredient in recipe.ingredients if ingredient not in session.deleted
+        )
@@ -0,0 +1,115 @@
+﻿import asyncio
+import json
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+# Un cliente que no consume a tiempo recibe esto en lugar de los eventos perdidos
+RESYNC_EVENT = {"type": "resync"}
+
+
+class Subscription:
+    """Conexión SSE de un usuario con una cola acotada"""
+
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def push(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta lo pendiente y se le pide resincronizar con /items/changes
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+
+class EventHub:
+    """Pub/sub en memoria del proceso (solo desde el event loop)
+
+    Cada suscripción ocupa una cola de como mucho queue_size eventos, así que
+    la memoria por conexión inactiva es constante.
+    """
+
+    def __init__(self, queue_size: int, max_per_user: int):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """Nueva suscripción, o None si el usuario ya tiene max_per_user abiertas
+
+        Comprobar y registrar sin awaits entre medias hace que el límite se
+        cumpla aunque lleguen varias conexiones a la vez.
+        """
+        subscriptions = self._subscribers.setdefault(user_id, set())
+        if len(subscriptions) >= self.max_per_user:
+            return None
+        subscription = Subscription(user_id, self.queue_size)
+        subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+
+    def connected_users(self) -> List[int]:
+        return list(self._subscribers)
+
+    def publish(self, user_id: int, message: dict) -> None:
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.push(message)
+
+
+event_hub = EventHub(
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    max_per_user=settings.EVENTS_MAX_STREAMS_PER_USER,
+)
+
+
+def format_sse(message: dict, event_id: Optional[str] = None) -> str:
+    """Serializar un evento en formato text/event-stream"""
+    lines = [f"event: {message['type']}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(message, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+# ============================================================================
+# PUBLICACIÓN AL CONFIRMAR LA TRANSACCIÓN
+# ============================================================================
+
+_PENDING_KEY = "events_pending"
+
+
+def publish_on_commit(db: AsyncSession, user_id: int, message: dict) -> None:
+    """Encolar un evento que solo se publica si la transacción actual confirma"""
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append((user_id, message))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    for user_id, message in session.info.pop(_PENDING_KEY, ()):
+        event_hub.publish(user_id, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,95 @@
+﻿import logging
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.core.database import AsyncSessionLocal
+from src.models.database_models import ExpirationScan, ItemExpiration, PantryItem
+
+logger = logging.getLogger(__name__)
+
+EXPIRING_WINDOW_DAYS = 7
+
+# Día para el que este proceso sabe que item_expirations está al día
+_current_day: Optional[date] = None
+_PENDING_KEY = "expiration_index_day"
+
+
+def window_end(day: date) -> date:
+    return day + timedelta(days=EXPIRING_WINDOW_DAYS)
+
+
+async def ensure_expiration_index(db: AsyncSession) -> date:
+    """Garantizar que item_expirations corresponde a hoy, recalculándola una vez al día
+
+    El recálculo va en la transacción de db. Solo lo hace el primer worker que
+    cambia expiration_scans.as_of; el resto espera a su commit y lo reutiliza.
+    """
+    today = date.today()
+    if _current_day == today:
+        return today
+
+    claimed = await db.execute(
+        update(ExpirationScan)
+        .where(
+            ExpirationScan.id == 1,
+            or_(ExpirationScan.as_of.is_(None), ExpirationScan.as_of < today)
+        )
+        .values(as_of=today)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount:
+        # Una sola pasada por el índice de expiration_date para todos los usuarios
+        await db.execute(delete(ItemExpiration))
+        await db.execute(
+            insert(ItemExpiration).from_select(
+                ["item_id", "user_id", "expiration_date"],
+                select(PantryItem.id, PantryItem.user_id, PantryItem.expiration_date)
+                .where(PantryItem.expiration_date <= window_end(today))
+            )
+        )
+        logger.info("Tabla de caducidades recalculada para %s", today)
+    db.sync_session.info[_PENDING_KEY] = today
+    return today
+
+
+async def reindex_items(db: AsyncSession, item_ids: Iterable[int]) -> None:
+    """Actualizar de forma incremental las filas de los items escritos en esta transacción"""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    today = await ensure_expiration_index(db)
+    await db.execute(delete(ItemExpiration).where(ItemExpiration.item_id.in_(item_ids)))
+    await db.execute(
+        insert(ItemExpiration).from_select(
+            ["item_id", "user_id", "expiration_date"],
+            select(PantryItem.id, PantryItem.user_id, PantryItem.expiration_date)
+            .where(
+                PantryItem.id.in_(item_ids),
+                PantryItem.expiration_date <= window_end(today)
+            )
+        )
+    )
+
+
+async def refresh_expiration_index() -> None:
+    """Tarea diaria del lifespan: recalcular la tabla al cambiar de día"""
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await ensure_expiration_index(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    global _current_day
+    day = session.info.pop(_PENDING_KEY, None)
+    if day is not None:
+        _current_day = day
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,53 @@
+﻿import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import AsyncSessionLocal
+from src.models.database_models import PantryItem
+from src.services.events import event_hub
+
+logger = logging.getLogger(__name__)
+
+# Límite de parámetros por consulta IN (SQLite admite 32766, pero así el plan no se degrada)
+USER_BATCH_SIZE = 500
+
+
+async def items_expiring_on(db: AsyncSession, user_ids: Iterable[int], day: date) -> Dict[int, List[dict]]:
+    """Items que caducan el día indicado, agrupados por usuario (índice user_id, expiration_date)"""
+    expiring: Dict[int, List[dict]] = {}
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        result = await db.execute(
+            select(PantryItem.user_id, PantryItem.id, PantryItem.name, PantryItem.quantity, PantryItem.unit)
+            .where(
+                PantryItem.user_id.in_(user_ids[start:start + USER_BATCH_SIZE]),
+                PantryItem.expiration_date == day
+            )
+            .order_by(PantryItem.user_id, PantryItem.id)
+        )
+        for user_id, item_id, name, quantity, unit in result:
+            expiring.setdefault(user_id, []).append(
+                {"id": item_id, "name": name, "quantity": quantity, "unit": unit}
+            )
+    return expiring
+
+
+def expiring_event(day: date, items: List[dict]) -> dict:
+    return {"type": "items.expiring", "date": day.isoformat(), "items": items}
+
+
+async def send_expiry_alerts() -> None:
+    """Avisar a los usuarios conectados de lo que caduca mañana (tarea diaria)"""
+    users = event_hub.connected_users()
+    if not users:
+        return
+    tomorrow = date.today() + timedelta(days=1)
+    async with AsyncSessionLocal() as session:
+        expiring = await items_expiring_on(session, users, tomorrow)
+    for user_id, items in expiring.items():
+        event_hub.publish(user_id, expiring_event(tomorrow, items))
+    logger.info("Avisos de caducidad enviados a %d usuarios", len(expiring))
+
@@ -0,0 +1,90 @@
+﻿from datetime import date
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.models.database_models import ItemExpiration, PantryItem
+from src.models.schemas import CategoryEnum, InventoryStats
+from src.services.expiration_index import ensure_expiration_index
+
+settings = get_settings()
+
+# Valor medio orientativo por item (EUR); sin precios reales es solo una estimación
+CATEGORY_VALUE_ESTIMATES = {
+    CategoryEnum.DAIRY.value: 2.5,
+    CategoryEnum.VEGETABLES.value: 2.0,
+    CategoryEnum.FRUITS.value: 2.5,
+    CategoryEnum.MEAT.value: 7.0,
+    CategoryEnum.FISH.value: 8.0,
+    CategoryEnum.GRAINS.value: 1.8,
+    CategoryEnum.BEVERAGES.value: 2.0,
+    CategoryEnum.SNACKS.value: 2.2,
+    CategoryEnum.CONDIMENTS.value: 2.5,
+    CategoryEnum.FROZEN.value: 4.0,
+    CategoryEnum.BAKERY.value: 1.5,
+}
+DEFAULT_VALUE_ESTIMATE = 2.0
+
+stats_cache = TTLCache(
+    maxsize=settings.STATS_CACHE_MAX_USERS,
+    ttl=settings.STATS_CACHE_TTL_SECONDS,
+)
+
+
+async def compute_inventory_stats(db: AsyncSession, user_id: int) -> InventoryStats:
+    """Calcular las estadísticas: totales por categoría y caducidades precalculadas"""
+    today = await ensure_expiration_index(db)
+
+    result = await db.execute(
+        select(
+            PantryItem.category,
+            func.count(PantryItem.id),
+            func.sum(case(
+                CATEGORY_VALUE_ESTIMATES,
+                value=PantryItem.category,
+                else_=DEFAULT_VALUE_ESTIMATE,
+            )),
+        )
+        .where(PantryItem.user_id == user_id)
+        .group_by(PantryItem.category)
+    )
+    items_by_category = {}
+    total_value = 0.0
+    for category, count, value in result.all():
+        items_by_category[category] = count
+        total_value += value or 0.0
+
+    # item_expirations solo contiene la ventana (caducados incluidos): rango corto sobre su índice
+    expiring_soon, expired = (await db.execute(
+        select(
+            func.count(),
+            func.sum(case((ItemExpiration.expiration_date < today, 1), else_=0)),
+        )
+        .where(ItemExpiration.user_id == user_id)
+    )).one()
+    expiring_soon = expiring_soon or 0
+    expired = expired or 0
+
+    return InventoryStats(
+        total_items=sum(items_by_category.values()),
+        items_by_category=items_by_category,
+        expiring_soon=expiring_soon,
+        expired_items=expired,
+        total_value_estimate=round(total_value, 2),
+    )
+
+
+async def get_cached_inventory_stats(db: AsyncSession, user_id: int, version: int) -> InventoryStats:
+    """Estadísticas del usuario desde caché; solo consulta la base de datos si falta"""
+    today = date.today()
+    cached = stats_cache.get(user_id)
+    # La clave es (día, versión del inventario): una escritura en cualquier worker
+    # sube la versión, y las cifras de caducidad cambian con el día
+    if cached is not None and cached[0] == (today, version):
+        return cached[1]
+
+    stats = await compute_inventory_stats(db, user_id)
+    stats_cache.set(user_id, ((today, version), stats))
+    return stats
@@ -0,0 +1,92 @@
+﻿import hashlib
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database_models import User
+
+
+async def bump_inventory_version(db: AsyncSession, user_id: int) -> int:
+    """Incrementar la versión del inventario dentro de la transacción de la escritura"""
+    return await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        # updated_at se conserva: es del perfil, no del inventario
+        .values(
+            inventory_version=User.inventory_version + 1,
+            inventory_updated_at=func.now(),
+            updated_at=User.updated_at,
+        )
+        .returning(User.inventory_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_inventory_version(db: AsyncSession, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """Versión y fecha del último cambio del inventario (una lectura por clave primaria)"""
+    row = (await db.execute(
+        select(User.inventory_version, User.inventory_updated_at).where(User.id == user_id)
+    )).one_or_none()
+    if row is None:
+        return 0, None
+    version, modified = row
+    # SQLite devuelve fechas sin zona: CURRENT_TIMESTAMP es UTC
+    if modified is not None and modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return version, modified
+
+
+def since_midnight(modified: Optional[datetime], today: date) -> datetime:
+    """Last-Modified de representaciones que dependen del día: nunca anterior a la medianoche local"""
+    midnight = datetime.combine(today, time.min).astimezone()
+    return max(modified, midnight) if modified else midnight
+
+
+def validator_headers(
+    resource: str,
+    version: int,
+    modified: Optional[datetime],
+    variant: str = "",
+) -> Dict[str, str]:
+    """ETag (versión + variante de la representación) y Last-Modified del recurso"""
+    digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    headers = {
+        "ETag": f'W/"{resource}-{version}-{digest}"',
+        # El cliente puede guardar la respuesta pero debe revalidarla siempre
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluar If-None-Match (prioritario) o If-Modified-Since contra las cabeceras calculadas"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Comparación débil: se ignora el prefijo W/
+        return _opaque(headers["ETag"]) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
@@ -0,0 +1,121 @@
+﻿import logging
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database_models import PantryItem, RecipeIngredient
+from src.services.normalization import fold_text, normalize_ingredient
+from src.services.units import parse_quantity, to_base, to_base_many
+
+logger = logging.getLogger(__name__)
+
+ITEM_DERIVED = ("search_name", "canonical_name", "base_quantity", "base_unit")
+INGREDIENT_DERIVED = ("normalized_name", "base_quantity", "base_unit")
+
+
+def item_fields(name: str, quantity: float, unit: str) -> dict:
+    """Columnas derivadas de un item: búsqueda (services.search), clave canónica y cantidad base"""
+    base_quantity, base_unit = to_base(quantity, unit)
+    return {
+        "search_name": fold_text(name),
+        "canonical_name": normalize_ingredient(name),
+        "base_quantity": base_quantity,
+        "base_unit": base_unit,
+    }
+
+
+def ingredient_fields(name: str) -> dict:
+    """Columnas derivadas de una línea de ingrediente ("200 g de arroz")"""
+    base_quantity, base_unit = parse_quantity(name) or (None, None)
+    return {"normalized_name": normalize_ingredient(name), "base_quantity": base_quantity, "base_unit": base_unit}
+
+
+def _quantity_unit(values: dict, current: Optional[Tuple[float, str]]) -> Optional[Tuple[float, str]]:
+    # (cantidad, unidad) con las que recalcular la cantidad base, o None si no cambian
+    if "quantity" not in values and "unit" not in values:
+        return None
+    quantity = values.get("quantity", current[0] if current else None)
+    unit = values.get("unit", current[1] if current else None)
+    if quantity is None or unit is None:
+        return None
+    return quantity, unit
+
+
+def _name_fields(values: dict) -> None:
+    if values.get("name") is not None:
+        values["search_name"] = fold_text(values["name"])
+        values["canonical_name"] = normalize_ingredient(values["name"])
+
+
+def with_derived_fields(values: dict, current: Optional[Tuple[float, str]] = None) -> dict:
+    """Añadir las columnas derivadas a los valores de un INSERT/UPDATE de items
+
+    current: (quantity, unit) guardados, para los UPDATE que cambian solo uno de los dos.
+    """
+    _name_fields(values)
+    quantity_unit = _quantity_unit(values, current)
+    if quantity_unit is not None:
+        values["base_quantity"], values["base_unit"] = to_base(*quantity_unit)
+    return values
+
+
+def with_derived_fields_many(
+    rows: List[dict], current: Optional[Sequence[Optional[Tuple[float, str]]]] = None
+) -> List[dict]:
+    """with_derived_fields para las filas de un lote: las cantidades base, con to_base_many"""
+    pending, quantities, units = [], [], []
+    for index, values in enumerate(rows):
+        _name_fields(values)
+        quantity_unit = _quantity_unit(values, current[index] if current else None)
+        if quantity_unit is not None:
+            pending.append(values)
+            quantities.append(quantity_unit[0])
+            units.append(quantity_unit[1])
+    if pending:
+        base_quantities, base_units = to_base_many(quantities, units)
+        for values, base_quantity, base_unit in zip(pending, base_quantities.tolist(), base_units.tolist()):
+            values["base_quantity"], values["base_unit"] = base_quantity, base_unit
+    return rows
+
+
+async def sync_derived_fields(db: AsyncSession) -> int:
+    """Recalcular las columnas derivadas guardadas cuyas reglas han cambiado (al arrancar)"""
+    result = await db.execute(
+        select(PantryItem.id, PantryItem.name, PantryItem.quantity, PantryItem.unit,
+               *(getattr(PantryItem, field) for field in ITEM_DERIVED))
+    )
+    item_changes = []
+    for item_id, name, quantity, unit, *stored in result.all():
+        fields = item_fields(name, quantity, unit)
+        if tuple(fields.values()) != tuple(stored):
+            item_changes.append({"item_id": item_id, **fields})
+
+    result = await db.execute(
+        select(RecipeIngredient.id, RecipeIngredient.name,
+               *(getattr(RecipeIngredient, field) for field in INGREDIENT_DERIVED))
+    )
+    ingredient_changes = []
+    for ingredient_id, name, *stored in result.all():
+        fields = ingredient_fields(name)
+        if tuple(fields.values()) != tuple(stored):
+            ingredient_changes.append({"id": ingredient_id, **fields})
+
+    if item_changes:
+        items = PantryItem.__table__
+        # Columnas derivadas: no es una edición del usuario, updated_at se conserva
+        await db.execute(
+            update(items)
+            .where(items.c.id == bindparam("item_id"))
+            .values(updated_at=items.c.updated_at, **{field: bindparam(field) for field in ITEM_DERIVED}),
+            item_changes,
+        )
+    if ingredient_changes:
+        await db.execute(update(RecipeIngredient), ingredient_changes)
+    changed = len(item_changes) + len(ingredient_changes)
+    if changed:
+        logger.info(
+            "Columnas derivadas recalculadas: %d items, %d ingredientes de recetas",
+            len(item_changes), len(ingredient_changes),
+        )
+    return changed
@@ -0,0 +1,143 @@
+﻿import json
+import logging
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from src.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """El proveedor de LLM no respondió o devolvió un error"""
+
+
+class LLMNotConfigured(LLMError):
+    """Falta la configuración del proveedor (p. ej. OPENAI_API_KEY)"""
+
+
+class LLMClient:
+    """Cliente de completions contra Ollama u OpenAI (mismos proveedores que llmClient.ts)
+
+    Un único httpx.AsyncClient con pool de conexiones y timeouts, creado al
+    primer uso y cerrado en el shutdown de la aplicación.
+    """
+
+    def __init__(self, provider: str, model: str):
+        if provider not in ("ollama", "openai"):
+            raise ValueError(f"LLM_PROVIDER desconocido: {provider}")
+        self.provider = provider
+        self.model = model or ("gpt-4o-mini" if provider == "openai" else "")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def is_configured(self) -> bool:
+        return self.provider != "openai" or bool(settings.OPENAI_API_KEY)
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if self.provider == "openai":
+                if not self.is_configured:
+                    raise LLMNotConfigured("OPENAI_API_KEY no configurada")
+                base_url = settings.OPENAI_BASE_URL
+                headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+            else:
+                base_url, headers = settings.OLLAMA_BASE_URL, {}
+            self._client = httpx.AsyncClient(
+                base_url=base_url.rstrip("/"),
+                headers=headers,
+                # La generación completa puede tardar; conectar no
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _request(self, system: str, prompt: str) -> tuple:
+        if self.provider == "openai":
+            return "/chat/completions", {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                "temperature": settings.LLM_TEMPERATURE,
+                "response_format": {"type": "json_object"},
+            }
+        return "/api/generate", {
+            "model": self.model,
+            "prompt": f"{system}\n{prompt}",
+            "format": "json",
+            "options": {"temperature": settings.LLM_TEMPERATURE},
+        }
+
+    async def complete(self, system: str, prompt: str) -> str:
+        """Texto completo generado para el prompt"""
+        path, body = self._request(system, prompt)
+        body["stream"] = False
+        try:
+            response = await self._http().post(path, json=body)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as exc:
+            raise LLMError(f"{self.provider} respondió {exc.response.status_code}") from exc
+        except (httpx.HTTPError, ValueError) as exc:
+            raise LLMError(f"{self.provider} no disponible: {exc}") from exc
+
+        try:
+            if self.provider == "openai":
+                return data["choices"][0]["message"]["content"]
+            return data["response"]
+        except (KeyError, IndexError, TypeError) as exc:
+            raise LLMError(f"Respuesta inesperada de {self.provider}") from exc
+
+    async def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        """Fragmentos de texto según los genera el modelo (SSE de OpenAI o NDJSON de Ollama)"""
+        path, body = self._request(system, prompt)
+        body["stream"] = True
+        try:
+            async with self._http().stream("POST", path, json=body) as response:
+                if response.is_error:
+                    raise LLMError(f"{self.provider} respondió {response.status_code}")
+                async for line in response.aiter_lines():
+                    text = self._stream_text(line)
+                    if text is None:
+                        break
+                    if text:
+                        yield text
+        except httpx.HTTPError as exc:
+            raise LLMError(f"{self.provider} no disponible: {exc}") from exc
+
+    def _stream_text(self, line: str) -> Optional[str]:
+        # "" = línea sin texto; None = fin del stream
+        line = line.strip()
+        if self.provider == "openai":
+            if not line.startswith("data:"):
+                return ""
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return None
+        else:
+            data = line
+        if not data:
+            return ""
+        try:
+            chunk = json.loads(data)
+            if self.provider == "openai":
+                # El último fragmento puede llegar sin choices (estadísticas de uso)
+                choices = chunk["choices"]
+                return (choices[0]["delta"].get("content") or "") if choices else ""
+            if chunk.get("done"):
+                return None
+            return chunk.get("response", "")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            raise LLMError(f"Fragmento inesperado de {self.provider}") from exc
+
+
+llm_client = LLMClient(settings.LLM_PROVIDER, settings.LLM_MODEL)
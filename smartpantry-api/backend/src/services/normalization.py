@@ -0,0 +1,134 @@
+﻿import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+# Cantidad sola ("200", "1,5") o pegada a la unidad ("500g", "1kg")
+_QUANTITY = re.compile(r"^(\d+)([a-z]*)$")
+
+# Variantes de escritura de cada unidad (sin tildes ni mayúsculas)
+UNIT_ALIASES: Dict[str, tuple] = {
+    "g": ("g", "gr", "grs", "gramo", "gramos"),
+    "kg": ("kg", "kgs", "kilo", "kilos", "kilogramo", "kilogramos"),
+    "mg": ("mg", "miligramo", "miligramos"),
+    "ml": ("ml", "mililitro", "mililitros"),
+    "cl": ("cl", "centilitro", "centilitros"),
+    "l": ("l", "lt", "lts", "litro", "litros"),
+    "unidad": ("u", "ud", "uds", "unidad", "unidades"),
+    "docena": ("docena", "docenas"),
+    "cucharada": ("cda", "cdas", "cucharada", "cucharadas"),
+    "cucharadita": ("cdta", "cdtas", "cucharadita", "cucharaditas"),
+    "taza": ("taza", "tazas"),
+    "vaso": ("vaso", "vasos"),
+    "pizca": ("pizca", "pizcas"),
+    "diente": ("diente", "dientes"),
+    "lata": ("lata", "latas"),
+    "bote": ("bote", "botes"),
+    "paquete": ("paquete", "paquetes", "paq"),
+}
+_UNITS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+# Calificativos que no cambian el ingrediente a efectos de receta (en singular)
+DESCRIPTORS = {
+    "fresco", "fresca", "cherry", "maduro", "madura", "natural", "entero", "entera",
+    "picado", "picada", "troceado", "troceada", "rallado", "rallada", "congelado", "congelada",
+    "conserva", "grande", "mediano", "mediana", "pequeno", "pequena", "extra", "virgen",
+    "ecologico", "ecologica", "bio", "campero", "campera",
+}
+
+# Sinónimos regionales y alias -> nombre canónico (las claves ya en forma canónica)
+ALIASES = {
+    "papa": "patata",
+    "jitomate": "tomate",
+    "tomate pera": "tomate",
+    "palta": "aguacate",
+    "choclo": "maiz",
+    "elote": "maiz",
+    "frijol": "alubia",
+    "poroto": "alubia",
+    "arveja": "guisante",
+    "chicharo": "guisante",
+    "ejote": "judia verde",
+    "zapallo": "calabaza",
+    "durazno": "melocoton",
+    "betabel": "remolacha",
+    "cacahuate": "cacahuete",
+    "mani": "cacahuete",
+    "aove": "aceite de oliva",
+    "pechuga de pollo": "pollo",
+    "muslo de pollo": "pollo",
+    "huevo de gallina": "huevo",
+}
+
+# Ingredientes cuyo nombre lleva un calificativo: "pan rallado" no es "pan"
+PHRASES = {"pan rallado"}
+
+# Plurales que no lo son
+_INVARIABLE = {"anis", "ananas", "cuscus", "lunes", "dosis", "brindis"}
+_CONNECTORS = {"de", "del", "con", "al", "en", "para"}
+
+
+def fold_text(value: str) -> str:
+    """Quitar diacríticos, pasar a minúsculas y compactar espacios"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped.lower()).strip()
+
+
+def known_unit(value: str) -> Optional[str]:
+    """Unidad canónica si value es una variante conocida ("kilos" -> "kg"), si no None"""
+    return _UNITS.get(fold_text(value).rstrip("."))
+
+
+def normalize_unit(unit: str) -> str:
+    """Unidad canónica ("Gramos" -> "g"); las desconocidas solo se pliegan"""
+    return known_unit(unit) or fold_text(unit).rstrip(".")
+
+
+def singularize(word: str) -> str:
+    """Singular de una palabra en español (reglas regulares, sin diccionario)"""
+    if len(word) <= 3 or not word.endswith("s") or word in _INVARIABLE:
+        return word
+    if word.endswith("ces"):
+        return word[:-3] + "z"  # nueces -> nuez
+    if word.endswith("es") and word[-3] in "lrn" and word[-4] in "aeiou":
+        return word[:-2]  # limones -> limon (pero carnes -> carne)
+    if word[-2] in "aeiou":
+        return word[:-1]  # tomates -> tomate
+    return word
+
+
+@lru_cache(maxsize=16384)
+def normalize_ingredient(name: str) -> str:
+    """Clave canónica de un ingrediente: "200 g de Tomates cherry" -> "tomate"
+
+    Pliega tildes y mayúsculas, quita cantidades y unidades, calificativos y
+    plurales y aplica los sinónimos. Es idempotente: la clave de una clave es
+    ella misma, así que sirve también sobre canonical_name ya calculados.
+    """
+    folded = fold_text(name)
+    words = []
+    after_quantity = False
+    for token in _NON_WORD.sub(" ", folded).split():
+        quantity = _QUANTITY.match(token)
+        if quantity and (not quantity.group(2) or quantity.group(2) in _UNITS):
+            after_quantity = True
+            continue
+        if after_quantity and (token in _UNITS or token == "de"):
+            continue
+        after_quantity = False
+        if len(token) == 1:
+            continue  # tallas ("huevos (L)") y conjunciones sueltas
+        word = singularize(token)
+        if words and f"{words[-1]} {word}" in PHRASES:
+            words[-1] = f"{words[-1]} {word}"
+        elif word not in DESCRIPTORS:
+            words.append(ALIASES.get(word, word))
+
+    while words and words[-1] in _CONNECTORS:
+        words.pop()
+    key = " ".join(words)
+    # Solo cantidades o calificativos: mejor el nombre plegado (en singular) que una clave vacía
+    return ALIASES.get(key, key) or " ".join(singularize(word) for word in folded.split())
@@ -0,0 +1,75 @@
+﻿import base64
+import json
+from datetime import date
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+Cursor = Tuple[Optional[date], int]
+SyncCursor = Tuple[int, int]
+
+
+def _encode(payload: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cursor inválido"
+    )
+
+
+def encode_cursor(sort_value: Optional[date], row_id: int) -> str:
+    """Codificar la posición (fecha, id) de la última fila devuelta"""
+    return _encode([sort_value.isoformat() if sort_value else None, row_id])
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decodificar un cursor generado por encode_cursor"""
+    try:
+        raw_date, row_id = _decode(cursor)
+        return (date.fromisoformat(raw_date) if raw_date else None, int(row_id))
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def encode_sync_cursor(version: int, row_id: int) -> str:
+    """Codificar la posición (versión de sincronización, id) del último cambio devuelto"""
+    return _encode([version, row_id])
+
+
+def decode_sync_cursor(cursor: str) -> SyncCursor:
+    """Decodificar un cursor generado por encode_sync_cursor"""
+    try:
+        version, row_id = _decode(cursor)
+        return int(version), int(row_id)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def keyset_after(date_column, id_column, cursor: Cursor):
+    """Filas posteriores al cursor en el orden (fecha ASC NULLS LAST, id ASC)"""
+    last_date, last_id = cursor
+    if last_date is None:
+        return and_(date_column.is_(None), id_column > last_id)
+    return or_(
+        date_column > last_date,
+        and_(date_column == last_date, id_column > last_id),
+        date_column.is_(None),
+    )
+
+
+def after_sync_cursor(version_column, id_column, cursor: SyncCursor):
+    """Filas posteriores al cursor en el orden (versión ASC, id ASC)"""
+    last_version, last_id = cursor
+    return or_(
+        version_column > last_version,
+        and_(version_column == last_version, id_column > last_id),
+    )
@@ -0,0 +1,220 @@
+﻿import logging
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.models.database_models import Recipe, RecipeIngredient
+from src.services.normalization import normalize_ingredient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RecipeMatch:
+    recipe_id: int
+    matched: int
+    total: int
+    match_percentage: float
+    missing_ingredients: List[str]
+
+
+class RecipeIndex:
+    """Índice invertido en memoria: ingrediente normalizado -> recetas"""
+
+    def __init__(self, initial_capacity: int = 1024):
+        # Cada receta ocupa un "slot" denso para poder contar coincidencias con bincount
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._recipe_ids = np.full(initial_capacity, -1, dtype=np.int64)
+        self._totals = np.zeros(initial_capacity, dtype=np.int32)
+        self._diet_flags = np.zeros(initial_capacity, dtype=np.int64)
+        self._ingredients: Dict[int, List[Tuple[str, str]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def clear(self) -> None:
+        self.__init__(initial_capacity=len(self._recipe_ids))
+
+    def upsert(self, recipe_id: int, ingredients: Iterable[str], diet_flags: int = 0) -> None:
+        """Insertar o reemplazar los ingredientes (y los bits de dieta) de una receta"""
+        self.remove(recipe_id)
+
+        entries: Dict[str, str] = {}
+        for ingredient in ingredients:
+            key = normalize_ingredient(ingredient)
+            if key and key not in entries:
+                entries[key] = ingredient.strip()
+
+        slot = self._free.pop() if self._free else self._next_slot()
+        self._slots[recipe_id] = slot
+        self._recipe_ids[slot] = recipe_id
+        self._totals[slot] = len(entries)
+        self._diet_flags[slot] = diet_flags
+        self._ingredients[slot] = list(entries.items())
+        for key in entries:
+            self._postings.setdefault(key, set()).add(slot)
+            self._arrays.pop(key, None)
+
+    def remove(self, recipe_id: int) -> None:
+        """Eliminar una receta del índice"""
+        slot = self._slots.pop(recipe_id, None)
+        if slot is None:
+            return
+        for key, _ in self._ingredients.pop(slot):
+            postings = self._postings[key]
+            postings.discard(slot)
+            if not postings:
+                del self._postings[key]
+            self._arrays.pop(key, None)
+        self._recipe_ids[slot] = -1
+        self._totals[slot] = 0
+        self._diet_flags[slot] = 0
+        self._free.append(slot)
+
+    def match(
+        self,
+        pantry_names: Iterable[str],
+        limit: int = 10,
+        min_percentage: float = 0.0,
+        diet_mask: int = 0,
+    ) -> List[RecipeMatch]:
+        """Puntuar recetas contra los nombres de la despensa (sin las incompatibles con diet_mask)"""
+        pantry_keys = {normalize_ingredient(name) for name in pantry_names}
+        keys = [key for key in pantry_keys if key in self._postings]
+        if not keys or limit <= 0:
+            return []
+
+        hits = np.bincount(
+            np.concatenate([self._posting_array(key) for key in keys]),
+            minlength=self._size,
+        )
+        # Operaciones sobre el vector completo: más baratas que extraer candidatos
+        scores = np.zeros(self._size)
+        np.divide(hits * 100.0, self._totals[: self._size], out=scores, where=hits > 0)
+        if min_percentage > 0:
+            scores[scores < min_percentage] = 0.0
+        if diet_mask:
+            # Mismo predicado que en SQL: diet_flags & mask == 0
+            scores[(self._diet_flags[: self._size] & diet_mask) != 0] = 0.0
+
+        # A igual porcentaje ganan las recetas que aprovechan más ingredientes
+        ranking = scores + hits * 1e-6
+        if self._size > limit:
+            top = np.argpartition(-ranking, limit - 1)[:limit]
+        else:
+            top = np.arange(self._size)
+        top = top[scores[top] > 0]
+        top = top[np.lexsort((-hits[top], -scores[top]))]
+
+        results = []
+        for slot in top:
+            ingredients = self._ingredients[slot]
+            results.append(
+                RecipeMatch(
+                    recipe_id=int(self._recipe_ids[slot]),
+                    matched=int(hits[slot]),
+                    total=len(ingredients),
+                    match_percentage=round(float(scores[slot]), 2),
+                    missing_ingredients=[
+                        original for key, original in ingredients if key not in pantry_keys
+                    ],
+                )
+            )
+        return results
+
+    def _next_slot(self) -> int:
+        if self._size == len(self._recipe_ids):
+            capacity = len(self._recipe_ids) * 2
+            self._recipe_ids = np.concatenate(
+                [self._recipe_ids, np.full(capacity - self._size, -1, dtype=np.int64)]
+            )
+            self._totals = np.concatenate(
+                [self._totals, np.zeros(capacity - self._size, dtype=np.int32)]
+            )
+            self._diet_flags = np.concatenate(
+                [self._diet_flags, np.zeros(capacity - self._size, dtype=np.int64)]
+            )
+        slot = self._size
+        self._size += 1
+        return slot
+
+    def _posting_array(self, key: str) -> np.ndarray:
+        array = self._arrays.get(key)
+        if array is None:
+            postings = self._postings[key]
+            array = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            self._arrays[key] = array
+        return array
+
+
+recipe_index = RecipeIndex()
+
+
+async def load_recipe_index(db: AsyncSession) -> int:
+    """Construir el índice desde recipe_ingredients (una vez al arrancar)"""
+    diet_flags = dict((await db.execute(select(Recipe.id, Recipe.diet_flags))).all())
+    result = await db.execute(
+        select(RecipeIngredient.recipe_id, RecipeIngredient.name)
+        .order_by(RecipeIngredient.recipe_id, RecipeIngredient.position)
+    )
+    recipe_index.clear()
+    for recipe_id, rows in groupby(result.all(), key=itemgetter(0)):
+        recipe_index.upsert(recipe_id, [name for _, name in rows], diet_flags.get(recipe_id, 0))
+    return len(recipe_index)
+
+
+# ============================================================================
+# SINCRONIZACIÓN CON LA BASE DE DATOS
+# ============================================================================
+
+_PENDING_KEY = "recipe_index_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_recipe_changes(session, flush_context):
+    """Anotar recetas modificadas; el índice solo se toca si la transacción confirma"""
+    changed = {obj for obj in session.new | session.dirty if isinstance(obj, Recipe)}
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, RecipeIngredient) and obj.recipe is not None:
+            changed.add(obj.recipe)
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Recipe)]
+    if not changed and not deleted:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for recipe in changed:
+        pending[recipe.id] = ([
+            ingredient.name
+            for ingredient in recipe.ingredients
+            if ingredient not in session.deleted
+        ], recipe.diet_flags or 0)
+    for recipe_id in deleted:
+        pending[recipe_id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_recipe_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for recipe_id, entry in pending.items():
+        if entry is None:
+            recipe_index.remove(recipe_id)
+        else:
+            recipe_index.upsert(recipe_id, *entry)
+    logger.debug("Índice de recetas actualizado: %d cambios", len(pending))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_recipe_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,171 @@
+﻿import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.models.database_models import PantryItem
+from src.services.inventory_version import get_inventory_version
+from src.services.normalization import fold_text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "pantry_items_fts"
+# Las consultas trigram necesitan términos de al menos 3 caracteres
+TRIGRAM = 3
+
+# Cota superior de los nombres que empiezan por un prefijo (comparación binaria UTF-8)
+PREFIX_END = "\U0010ffff"
+
+
+def search_key(name: str) -> str:
+    """Texto indexado de un item (PantryItem.search_name): sin tildes, en minúsculas y con espacios compactados"""
+    return fold_text(name)
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + TRIGRAM] for i in range(len(value) - TRIGRAM + 1)}
+
+
+def _rank(key: str, terms: List[str]) -> Tuple:
+    # Mismo orden que en SQLite: primero los que empiezan por el primer término (alfabético),
+    # después los nombres más cortos
+    if key.startswith(terms[0]):
+        return (0, 0, key)
+    return (1, len(key), key)
+
+
+class TrigramIndex:
+    """Índice trigram en memoria de los items de un usuario (bases de datos sin FTS5)"""
+
+    def __init__(self, rows: List[Tuple[int, str]]):
+        self._keys: Dict[int, str] = dict(rows)
+        self._postings: Dict[str, Set[int]] = {}
+        for item_id, key in rows:
+            for trigram in _trigrams(key):
+                self._postings.setdefault(trigram, set()).add(item_id)
+
+    def search(self, terms: List[str], limit: int) -> List[int]:
+        candidates: Optional[Set[int]] = None
+        for term in terms:
+            for trigram in _trigrams(term):
+                postings = self._postings.get(trigram, set())
+                candidates = set(postings) if candidates is None else candidates & postings
+        if candidates is None:
+            # Solo términos cortos: recorrer los nombres del usuario
+            candidates = set(self._keys)
+        # Los trigramas no garantizan el orden ni la contigüidad: confirmar la subcadena
+        matches = [
+            item_id for item_id in candidates
+            if all(term in self._keys[item_id] for term in terms)
+        ]
+        matches.sort(key=lambda item_id: (*_rank(self._keys[item_id], terms), item_id))
+        return matches[:limit]
+
+
+class ItemSearch:
+    """Búsqueda de items por nombre (subcadena, sin distinguir tildes ni mayúsculas)
+
+    En SQLite usa la tabla FTS5 trigram pantry_items_fts, que mantienen los
+    triggers de la migración 0008. En otros motores, o si SQLite no trae FTS5,
+    usa un TrigramIndex por usuario, cacheado por versión de inventario.
+    Orden: primero los nombres que empiezan por el primer término, después el resto
+    de coincidencias de más corto a más largo.
+    """
+
+    def __init__(self, max_users: int = 1000):
+        self._fts: Optional[bool] = None
+        self._indexes = TTLCache(maxsize=max_users, ttl=3600)
+
+    async def _has_fts(self, db: AsyncSession) -> bool:
+        if self._fts is None:
+            bind = db.get_bind()
+            self._fts = bind.dialect.name == "sqlite" and bool(await db.scalar(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ))
+            if not self._fts:
+                logger.info("Búsqueda de items con índice trigram en memoria (sin FTS5)")
+        return self._fts
+
+    async def search(self, db: AsyncSession, user_id: int, query: str, limit: int) -> List[PantryItem]:
+        terms = search_key(query).split()
+        if not terms:
+            return []
+        if await self._has_fts(db):
+            return await self._search_fts(db, user_id, terms, limit)
+        return await self._search_memory(db, user_id, terms, limit)
+
+    async def _search_fts(self, db: AsyncSession, user_id: int, terms: List[str], limit: int) -> List[PantryItem]:
+        # 1) Nombres que empiezan por el primer término: rango sobre (user_id, search_name)
+        result = await db.scalars(
+            select(PantryItem)
+            .where(
+                PantryItem.user_id == user_id,
+                PantryItem.search_name >= terms[0],
+                PantryItem.search_name < terms[0] + PREFIX_END,
+                *(func.instr(PantryItem.search_name, term) > 0 for term in terms[1:])
+            )
+            .order_by(PantryItem.search_name, PantryItem.id)
+            .limit(limit)
+        )
+        items = list(result)
+        if len(items) == limit:
+            return items
+
+        # 2) El resto de coincidencias, que contienen los términos en cualquier posición
+        found = {item.id for item in items}
+        short_terms = [term for term in terms if len(term) < TRIGRAM]
+        long_terms = [term for term in terms if len(term) >= TRIGRAM]
+        params = {"user_id": user_id}
+        conditions = ["pantry_items.user_id = :user_id"]
+        for index, term in enumerate(short_terms):
+            conditions.append(f"instr(pantry_items.search_name, :term{index}) > 0")
+            params[f"term{index}"] = term
+        if long_terms:
+            # Cada término como frase: el tokenizer trigram la resuelve como subcadena.
+            # CROSS JOIN fija el orden en SQLite: se recorren las coincidencias de FTS
+            # y no todos los items del usuario.
+            conditions.append(f"{FTS_TABLE} MATCH :match")
+            params["match"] = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+            sql = (
+                f"SELECT pantry_items.id FROM {FTS_TABLE} "
+                f"CROSS JOIN pantry_items ON pantry_items.id = {FTS_TABLE}.rowid "
+            )
+        else:
+            sql = "SELECT pantry_items.id FROM pantry_items "
+        if found:
+            conditions.append(f"pantry_items.id NOT IN ({', '.join(str(item_id) for item_id in found)})")
+        params["limit"] = limit - len(items)
+        sql += (
+            "WHERE " + " AND ".join(conditions)
+            + " ORDER BY length(pantry_items.search_name), pantry_items.search_name, pantry_items.id LIMIT :limit"
+        )
+
+        ids = list(await db.scalars(text(sql), params))
+        if ids:
+            # El IN (...) no conserva el orden de la consulta anterior
+            result = await db.scalars(select(PantryItem).where(PantryItem.id.in_(ids)))
+            items += sorted(result, key=lambda item: (len(item.search_name), item.search_name, item.id))
+        return items
+
+    async def _search_memory(self, db: AsyncSession, user_id: int, terms: List[str], limit: int) -> List[PantryItem]:
+        version, _ = await get_inventory_version(db, user_id)
+        cached = self._indexes.get(user_id)
+        if cached is None or cached[0] != version:
+            rows = await db.execute(
+                select(PantryItem.id, PantryItem.search_name).where(PantryItem.user_id == user_id)
+            )
+            cached = (version, TrigramIndex(rows.all()))
+            self._indexes.set(user_id, cached)
+
+        ids = cached[1].search(terms, limit)
+        if not ids:
+            return []
+        result = await db.scalars(select(PantryItem).where(PantryItem.id.in_(ids)))
+        items = {item.id: item for item in result}
+        return [items[item_id] for item_id in ids if item_id in items]
+
+
+item_search = ItemSearch()
@@ -0,0 +1,125 @@
+﻿import math
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database_models import PantryItem, Recipe, RecipeIngredient
+from src.models.schemas import ShoppingPlan, ShoppingPlanItem
+from src.services.units import MASS, VOLUME, convert_many, density
+
+# Por debajo de esto lo que falta es ruido de redondeo
+EPSILON = 1e-6
+# Unidad en la que se agrupa un ingrediente pedido en varias: masa, volumen, el resto
+_UNIT_PRIORITY = {MASS: 0, VOLUME: 1}
+
+
+def _unit_rank(unit: str) -> Tuple[int, str]:
+    return _UNIT_PRIORITY.get(unit, 2), unit
+
+
+def _plan_query(user_id: int, recipe_ids: List[int]):
+    """Una sola consulta agregada: lo que piden las recetas y lo que hay de esos ingredientes
+
+    Ambos lados agrupados por clave canónica y unidad base; el de la despensa
+    se resuelve solo con idx_item_user_canonical.
+    """
+    in_recipes = RecipeIngredient.recipe_id.in_(recipe_ids)
+    needed = (
+        select(
+            literal("need").label("side"),
+            RecipeIngredient.normalized_name.label("name"),
+            RecipeIngredient.base_unit.label("unit"),
+            RecipeIngredient.recipe_id.label("recipe_id"),
+            func.sum(RecipeIngredient.base_quantity).label("quantity"),
+        )
+        .where(in_recipes)
+        .group_by(RecipeIngredient.normalized_name, RecipeIngredient.base_unit, RecipeIngredient.recipe_id)
+    )
+    stock = (
+        select(
+            literal("have"),
+            PantryItem.canonical_name,
+            PantryItem.base_unit,
+            null(),
+            func.sum(PantryItem.base_quantity),
+        )
+        .where(
+            PantryItem.user_id == user_id,
+            PantryItem.canonical_name.in_(select(RecipeIngredient.normalized_name).where(in_recipes)),
+        )
+        .group_by(PantryItem.canonical_name, PantryItem.base_unit)
+    )
+    return union_all(needed, stock)
+
+
+def _round(quantity: float, unit: str) -> float:
+    # Piezas y envases se compran enteros
+    if unit in _UNIT_PRIORITY:
+        return round(quantity, 1)
+    return float(math.ceil(quantity - EPSILON))
+
+
+async def plan_shopping(db: AsyncSession, user_id: int, recipe_ids: List[int], multiplier: float) -> ShoppingPlan:
+    """Ingredientes (y cantidades) que faltan en la despensa para cocinar las recetas"""
+    found = set((await db.scalars(select(Recipe.id).where(Recipe.id.in_(recipe_ids)))).all())
+    missing_recipes = sorted(set(recipe_ids) - found)
+    if not found:
+        return ShoppingPlan(items=[], missing_recipe_ids=missing_recipes)
+
+    rows = (await db.execute(_plan_query(user_id, sorted(found)))).all()
+    stocked: Set[str] = {name for side, name, *_ in rows if side == "have"}
+
+    # Una línea por ingrediente y unidad: las mismas cantidades de varias recetas se suman
+    targets: Dict[str, str] = {}
+    unquantified: Dict[str, Set[int]] = {}
+    for side, name, unit, recipe_id, _ in rows:
+        if side != "need":
+            continue
+        if unit is None:
+            unquantified.setdefault(name, set()).add(recipe_id)
+        elif name not in targets or _unit_rank(unit) < _unit_rank(targets[name]):
+            targets[name] = unit
+
+    quantified = [row for row in rows if row.unit is not None and row.name in targets]
+    amounts = [row.quantity * multiplier if row.side == "need" else row.quantity for row in quantified]
+    converted = convert_many(
+        amounts,
+        [row.unit for row in quantified],
+        [targets[row.name] for row in quantified],
+        [density(row.name) or np.nan for row in quantified],
+    )
+
+    lines: Dict[Tuple[str, str], list] = {}  # (nombre, unidad) -> [necesario, en despensa, recetas]
+    for row, amount, value in zip(quantified, amounts, converted):
+        if np.isnan(value):
+            # Sin conversión posible (latas frente a gramos): la fila va en su propia unidad
+            unit = row.unit
+        else:
+            unit, amount = targets[row.name], float(value)
+        line = lines.setdefault((row.name, unit), [0.0, 0.0, set()])
+        if row.side == "need":
+            line[0] += amount
+            line[2].add(row.recipe_id)
+        else:
+            line[1] += amount
+
+    items = []
+    for (name, unit), (needed, have, recipes) in lines.items():
+        if needed - have <= EPSILON or not recipes:
+            continue
+        items.append(ShoppingPlanItem(
+            name=name,
+            quantity=_round(needed - have, unit),
+            unit=unit,
+            in_pantry=round(have, 1),
+            recipe_ids=sorted(recipes | unquantified.get(name, set())),
+        ))
+    for name, recipes in unquantified.items():
+        # Sin cantidad en la receta: solo falta si no hay nada de ese ingrediente
+        if name not in targets and name not in stocked:
+            items.append(ShoppingPlanItem(name=name, recipe_ids=sorted(recipes)))
+
+    items.sort(key=lambda item: (item.name, item.unit or ""))
+    return ShoppingPlan(items=items, missing_recipe_ids=missing_recipes)
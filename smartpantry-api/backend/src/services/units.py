@@ -0,0 +1,136 @@
+﻿import re
+from fractions import Fraction
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.normalization import fold_text, known_unit, normalize_ingredient, normalize_unit
+
+# Unidades base: toda cantidad se guarda en una de ellas (o en su propia unidad si no se conoce)
+MASS, VOLUME, COUNT = "g", "ml", "unidad"
+
+# Unidad canónica (services.normalization.UNIT_ALIASES) -> (unidad base, factor)
+UNITS: Dict[str, Tuple[str, float]] = {
+    "mg": (MASS, 0.001),
+    "g": (MASS, 1.0),
+    "kg": (MASS, 1000.0),
+    "ml": (VOLUME, 1.0),
+    "cl": (VOLUME, 10.0),
+    "l": (VOLUME, 1000.0),
+    "cucharadita": (VOLUME, 5.0),
+    "cucharada": (VOLUME, 15.0),
+    "vaso": (VOLUME, 200.0),
+    "taza": (VOLUME, 240.0),
+    "pizca": (MASS, 0.5),
+    "unidad": (COUNT, 1.0),
+    "docena": (COUNT, 12.0),
+}
+# diente, lata, bote, paquete...: envases y piezas sin equivalencia fija, se quedan en su unidad
+
+# Densidad (g/ml) por ingrediente canónico, para pasar entre masa y volumen
+DENSITIES: Dict[str, float] = {
+    "agua": 1.0,
+    "leche": 1.03,
+    "nata": 1.01,
+    "yogur": 1.03,
+    "aceite": 0.92,
+    "aceite de oliva": 0.91,
+    "vinagre": 1.01,
+    "vino": 0.99,
+    "caldo": 1.0,
+    "zumo": 1.04,
+    "miel": 1.42,
+    "mantequilla": 0.91,
+    "harina": 0.53,
+    "azucar": 0.85,
+    "sal": 1.2,
+    "arroz": 0.85,
+    "pan rallado": 0.45,
+    "cacao": 0.5,
+}
+# density() busca por normalize_ingredient: una clave que no sea su propia forma canónica no se alcanza
+assert all(normalize_ingredient(key) == key for key in DENSITIES), "Claves de DENSITIES no canónicas"
+
+_NUMBER_WORDS = {"un": 1.0, "una": 1.0, "uno": 1.0, "medio": 0.5, "media": 0.5, "dos": 2.0, "tres": 3.0}
+# "1", "1,5", "1.5", "1/2", "1 1/2" o "una", con la unidad opcionalmente pegada a la cifra ("500g")
+_LEADING_QUANTITY = re.compile(
+    r"^(?:(?P<number>\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)(?P<glued>[a-z]+\.?)?"
+    r"|(?P<word>" + "|".join(sorted(_NUMBER_WORDS, key=len, reverse=True)) + r")\b)\s*(?P<rest>.*)$"
+)
+
+
+def to_base(quantity: float, unit: str) -> Tuple[float, str]:
+    """(cantidad, unidad base): 1.5 "kg" -> (1500.0, "g"); unidades desconocidas se conservan"""
+    canonical = normalize_unit(unit)
+    base_unit, factor = UNITS.get(canonical, (canonical, 1.0))
+    return quantity * factor, base_unit
+
+
+def to_base_many(quantities: Sequence[float], units: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """to_base sobre arrays: cada unidad distinta se resuelve una vez y el resto es un producto"""
+    resolved = {unit: to_base(1.0, unit) for unit in set(units)}
+    factors = np.fromiter((resolved[unit][0] for unit in units), dtype=np.float64, count=len(units))
+    base_units = np.fromiter((resolved[unit][1] for unit in units), dtype=object, count=len(units))
+    return np.asarray(quantities, dtype=np.float64) * factors, base_units
+
+
+def density(name: str) -> Optional[float]:
+    """Densidad del ingrediente (o de su primera palabra: "aceite de girasol" -> aceite)"""
+    key = normalize_ingredient(name)
+    found = DENSITIES.get(key)
+    if found is None:
+        found = DENSITIES.get(key.split(" ", 1)[0])
+    return found
+
+
+def convert_many(
+    quantities: Sequence[float],
+    base_units: Sequence[str],
+    target_units: Sequence[str],
+    densities: Optional[Sequence[float]] = None,
+) -> np.ndarray:
+    """Pasar cantidades base a la unidad base destino de cada fila; NaN si no hay conversión
+
+    Misma unidad: sin cambios. Entre g y ml se usa la densidad de la fila
+    (NaN si no se conoce). Cualquier otra combinación no es convertible.
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    # Arrays de objetos: las comparaciones con == son elemento a elemento y baratas
+    source = np.asarray(base_units, dtype=object)
+    target = np.asarray(target_units, dtype=object)
+
+    result = np.where(source == target, quantities, np.nan)
+    if densities is not None:
+        densities = np.asarray(densities, dtype=np.float64)
+        mass_to_volume = (source == MASS) & (target == VOLUME)
+        volume_to_mass = (source == VOLUME) & (target == MASS)
+        result[mass_to_volume] = quantities[mass_to_volume] / densities[mass_to_volume]
+        result[volume_to_mass] = quantities[volume_to_mass] * densities[volume_to_mass]
+    return result
+
+
+def parse_quantity(text: str) -> Optional[Tuple[float, str]]:
+    """Cantidad base de una línea de ingrediente: "200 g de arroz" -> (200.0, "g")
+
+    Sin unidad cuenta piezas ("2 huevos" -> (2.0, "unidad")); sin cantidad
+    devuelve None.
+    """
+    match = _LEADING_QUANTITY.match(fold_text(text))
+    if match is None:
+        return None
+    if match.group("word"):
+        quantity = _NUMBER_WORDS[match.group("word")]
+    else:
+        try:
+            quantity = float(sum(Fraction(part) for part in match.group("number").replace(",", ".").split()))
+        except ZeroDivisionError:
+            return None
+
+    glued = match.group("glued")
+    if glued:
+        unit = known_unit(glued)
+        if unit is None:
+            return None  # "3er", "2x": no es una cantidad
+    else:
+        unit = known_unit(match.group("rest").split(" ", 1)[0]) or COUNT
+    return to_base(quantity, unit)